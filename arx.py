@@ -16,6 +16,23 @@ modified 15 Jul 2020 - jimlux - add wakeup function
 	20210107 - LRD:  Changed final else: clause in parsecmd() to handle any command not known 
                          when the preceeding clauses were written.
 	20210108 - LRD:  Changed timeout parameter in Serial.serial() call from 0.1 to 1.0.
+	20261018 - receive() returns at the CR, with per-command deadlines from the
+                   Command Dictionary instead of the fixed serial timeout (arxframe.py).
+	20261018 - parsecmd() prints the arxresult of each command with arxformat.show().
+	20261018 - arx485 baud rate parameter and setbaud(); COMM as in rev 1.7 (see arxbaud.py).
+	20261018 - dateutil imported only for STIM with a date.
+	20261018 - --input runs a script in batch, logging to --logfile (arxscript.py);
+                   parsecmd() split into compilecmd() for the command and its arguments.
+	20261018 - compilecmd() checks arguments against the command registry
+                   (arxregistry.py) instead of a chain of tests for each command.
+	20261018 - arx485 sends the wake-up character only after SLEP or a long
+                   idle period (arx485.wake); arx.wakeup() no longer passes the
+                   bus as the address.
+	20261018 - !SCAN at the prompt finds the boards on the bus (arxscan.py);
+                   receive() takes a deadline for the first character.
+	20261018 - checkack() uses arxframe.parsereply(), one scan for the ACK or NAK.
+	20261018 - --logfile also logs interactive commands as CSV; for sweeps
+                   see arxsweep.py --archive (arxarchive.py).
 
 @author: jimlux
 """
@@ -25,8 +42,12 @@ arxmod.defaultaddress= 0x2
 arxmod.currentaddr = arxmod.defaultaddress
 debug = False
 
+import time
 import serial
+import arxframe
 import arxcmds
+import arxformat
+import arxregistry
 
 class arx485:
     """ class to manage a 485 bus connected to arx boards
@@ -35,23 +56,29 @@ class arx485:
     one can instantiate multiple buses if desired
     
     """
-    def __init__(self,name,port):
+    def __init__(self,name,port,baudrate=19200):
         self.name = name
         self.serial=None
         try:
             self.serial = serial.Serial(
                 port = port,
-                baudrate = 19200,
+                baudrate = baudrate,
                 parity = serial.PARITY_NONE,
                 stopbits = serial.STOPBITS_ONE,
                 bytesize = serial.EIGHTBITS,
-                timeout = 1.0,
+                timeout = arxframe.responsetime,
                 writeTimeout = 0
                 )
         except serial.SerialException:
             print("Serial port not found: %s"%port)
         else:
             pass
+        self.deadline = arxframe.responsetime
+        self.quietuntil = 0.0
+        self.asleep = False     # a SLEP was the last command sent
+        self.lastactivity = 0.0 # time.monotonic() of the last character on the bus
+        self.metrics = None
+        self.lastsend = None
         #self.clear_buffers()
         #self.incoming_data = ''
         #self.saved_data = []
@@ -59,14 +86,41 @@ class arx485:
     def send(self,addr,string):
         s = bytearray('\0'+string+chr(13),'utf-8')
         s[0]=addr+0x80       # put the address in.
+        wait = self.quietuntil - time.monotonic()
+        if wait > 0:         # bus still quiet after a broadcast or RSET
+            time.sleep(wait)
+        self.wake()
         n = self.serial.write(s)
+        # response deadline is counted from the last character on the wire
+        tsent = arxframe.wiretime(len(s),self.serial.baudrate)
+        respond = arxframe.responsedeadline(addr,string)
+        if respond > 0:
+            self.deadline = tsent + respond + arxframe.latencymargin
+        else:
+            self.deadline = 0.0
+            self.quietuntil = time.monotonic() + tsent + arxframe.broadcastpause
+        self.asleep = arxframe.putstosleep(string)
+        self.lastactivity = time.monotonic() + tsent
+        if self.metrics:
+            self.lastsend = (addr,string,len(s),time.monotonic()+tsent)
         if debug:
             print (s)
             print("%d characters sent"%n)
             
-    def receive(self,nchars):
-        s = self.serial.read(nchars)
-        
+    def receive(self,nchars=arxframe.MAXRESPONSE,deadline=None,first=None):
+        """read one response, up to the CR or the deadline set by the last send.
+        first is an optional deadline for the first character (see arxframe.readframe).
+        """
+        if deadline is None:
+            deadline = self.deadline
+        s = arxframe.readframe(self.serial,nchars,deadline,first)
+        if s:
+            self.lastactivity = time.monotonic()
+        if self.metrics and self.lastsend:
+            addr,string,sent,tsent = self.lastsend
+            self.metrics.record(self.name,addr,string,sent,s,time.monotonic()-tsent,
+                                expectreply=self.deadline>0)
+            self.lastsend = None
         if debug:
             print('%d characters read'%len(s))
         return(s)
@@ -76,10 +130,31 @@ class arx485:
         r = self.receive(nchars)
         print(r)
         
+    def setMetrics(self,metrics=None):
+        """record every transaction in metrics, an arxmetrics.arxmetrics"""
+        self.metrics = metrics
+        
+    def wake(self,force=False):
+        """send the wake-up character and wait, if the boards may be asleep
+        (see arxframe.mightsleep) or if force.  Returns True if it was sent.
+        """
+        if not (force or arxframe.mightsleep(self.asleep,self.lastactivity)):
+            return False
+        self.serial.write(arxframe.WAKEUP)
+        time.sleep(arxframe.wiretime(len(arxframe.WAKEUP),self.serial.baudrate)+arxframe.wakeuptime)
+        self.asleep = False
+        self.lastactivity = time.monotonic()
+        return True
+    
     def clear_buffers(self):
         self.serial.flushInput()
         self.serial.flushOutput()
         
+    def setbaud(self,baudrate):
+        """change the baud rate of the port, e.g. after boards are moved with COMM"""
+        self.serial.baudrate = baudrate
+        self.clear_buffers()
+        
 
 
 class arx:
@@ -108,7 +183,7 @@ class arx:
         the first command message.  [The sleep and wakeup feature is not implemented in the 
         developmental board software that is currently available.]    
         """
-        self.bus.send(self.bus,'!')
+        self.bus.wake(force=True)
 
     
 """
@@ -159,49 +234,18 @@ def checkack(resparray):
     """ TODO: need to allow for line terminator variability?"""
 
     
-    #print(resparray)
-    if len(resparray)<1:
+    try:
+        reply = arxframe.parsereply(resparray)
+    except arxframe.arxtimeout:
         print("Timeout - String zero length")
         return (False,resparray)
-    
-    while len(resparray)>0:
-        
-        if resparray[0] == 6:         #ASCII ACK
-
-            return (True,resparray)
-        if resparray[0] == 0x15:
-            if len(resparray)<2:
-                print("Malformed NAK, only 1 char long")
-                return (False,resparray)
-         
-            if resparray[1] == ord('1'):
-                print("Invalid command received by arx")
-            elif resparray[1] == ord('2'):
-                print("command too long, ignored")
-            elif resparray[1] == ord('3'):
-                if len(resparray)<3:
-                    print("malformed NAK, generic code 3, no remaining characters")
-                    return (False,resparray)
-                print("Command failed, reason: %s"%chr(resparray[2]))
-                if resparray[2] == ord('1'):
-                    print ("Invalid argument")
-                elif resparray[2] == ord('2'):
-                    print ("channel number out of range")
-                elif resparray[2] == ord('3'):
-                    print("I2C bus timeout")
-                elif resparray[2] == ord('4'):
-                    print("I2 bus device failed to acknowledge")
-                else:
-                    print("unknown reason")
-            else:
-                print("invalid generic error code as first char of NAK %s in string %s"%(resparray[1],resparray))
-
-            return (False,resparray)
-        #print("skipping character neither ack nor nak %d"%resparray[0])
-        resparray=resparray[1:]
-        
-    print("no response")
-    return (False,resparray)
+    except arxframe.arxnak as e:
+        print(arxformat.naktext(e.generic+e.reason))
+        return (False,resparray[e.garbage:])
+    except arxframe.arxgarbage:
+        print("no response")
+        return (False,resparray[len(resparray):])
+    return (True,resparray[reply.garbage:])
 
 
 def hextoint(string):
@@ -236,24 +280,11 @@ def arxhelp():
     print("   21 ARXN  - sends ARXN command to address 0x95 = 0x80 + 0x15")
     print("   0x10 ARXN - sends ARXN command to address 0x90 ")
     print("? prints this help")
+    print("!SCAN    finds every board on the bus with ARXN and lists them")
     print("!string  sends everything after the bang as a literal string")
     print("non printing characters can be entered as hex with a backslash escape")
     print(" \\x08 is the BEL character")
     
-import datetime
-from dateutil.parser import parse
-    
-def parsechannel(s,max=15):
-    try:
-        v = int(s,0)
-    except ValueError:
-        print ("Invalid format for number")
-        v=-1
-    if v<0 or v>max:
-        print ("Invalid Channel %d (0-%d expected)"%(v,max))
-        v=-1
-    return v
-
 def parsecmd(s,cmdhandler):
     ss = s.split()
     arxmod.currentaddr = arxmod.defaultaddress
@@ -269,6 +300,8 @@ def parsecmd(s,cmdhandler):
             return False
         if temp==128 or temp==0:
             print("Setting broadcast. Prefer using *")
+        if temp==128:
+            temp = 0
         arxmod.currentaddr = temp   
         print("setting currentaddr",temp)
         arxmod.defaultaddress=temp
@@ -284,119 +317,91 @@ def parsecmd(s,cmdhandler):
         print("Setting broadcast")
         arxmod.currentaddr = 0
         ss=ss[1:]
-        cmdhandler.setAddr(arxmod.currentaddr)
     if len(ss) ==0:  
         return
+    if arxmod.currentaddr == 0 and not broadcastsafe(ss[0]):
+        print("%s must not be broadcast"%ss[0])
+        return False
+    step = compilecmd(ss)
+    if step is None:
+        return False
+    method,args = step
+    cmdhandler.setAddr(arxmod.currentaddr)
+    res = getattr(cmdhandler,method)(*args)
+    arxformat.show(res,cmdhandler.t,cmdhandler.human)
+    return res
+
+def compilecmd(ss):
+    """compilecmd - the arxcmd method and arguments for a command split into words.
+    The arguments are checked against the command's format in arxregistry:
+    one number per field, e.g. SETC 3 0x8000, or 16 for SETA.  A command that
+    arxcmd has no method for is sent with arxcmd.command; one that is not in
+    the dictionary is sent as typed.
+    Returns (method,args), or None if the arguments are invalid.
+    """
     cmd = ss[0]
-    
-    
-    
-    
-    if cmd == "ECHO":
-        """ concatenate everything after the command as the argument"""
-        arg = " ".join(ss[1:])
-        cmdhandler.echo(arg)
-        
-    elif cmd == "RSET":
-        #cmdhanlder.rset()
-        pass
-    elif cmd == "ARXN":
-        cmdhandler.arxn()
-    elif cmd == "ANLG":
-        channel = parsechannel(ss[1],255)
-        if channel>=0:
-            cmdhandler.anlg(channel)
-        
-    elif cmd == "COMM":
-        if len(ss) <2:
-            print("not enough arguments, need new address and optional config")
-        else:
-            addr = int(ss[1])
-            
-            if len(ss)>2:
-                config = int(ss[2])
-                cmdhandler.comm(addr,config=config)
-            else:
-                cmdhandler.comm(addr)
-    
-    
-    elif cmd == "GTIM":
-        cmdhandler.gtim()
-
-    elif cmd == "STIM":
-        if len(ss)<2:
-            timeval =  datetime.datetime.now()
-        else:
-            if ss[1] == "NOW":
-                timeval = datetime.datetime.now()
-            else:
-                try:
-                    timeval = parse(ss[1])
-                except ValueError:
-                    print ("invalid date time format, try dd-mmm-yyyy hh:mm:ss")
-                    timeval=None
-                    
-        if timeval:
-            t = int(timeval.timestamp())
-            print("unix timestamp: %d "%t)
-            cmdhandler.stim(t)
-        
-    elif cmd == "LAST":
-        cmdhandler.last()
-        
-    elif cmd == "SETC":
-        channel = int(ss[1],0)
-        config= int(ss[2],0)
-        print("setc - channel %d, config %x"%(channel,config))
-        if channel>=0 and channel<16:
-            cmdhandler.setc(channel,config)
-        else:
-            print("Invalid channel, 0-15 expected")
-        
-    elif cmd == "GETC":
-        if len(ss)<2:
-            print("missing channel #")
-        else:
-            channel = int(ss[1],0)
-            print("getc channel %d"%channel)
-            if channel>=0 and channel<16:
-                cmdhandler.getc(channel)
-            else:
-                print("invalid channel, 0-15 expected")
-            
-    elif cmd == "SETA":
-        config=int(ss[1],0)
-        cmdhandler.seta(config)
-    elif cmd == "SETS":
-        config=int(ss[1],0)
-        cmdhandler.sets(config)
-    elif cmd == "LOAD":
-        cmdhandler.load()
-    elif cmd == "SAVE":
-        cmdhandler.save()
-    elif cmd == "POWC":
-        channel = int(ss[1],0)
-        cmdhandler.powc(channel)
-        
-    elif cmd == "POWA":
-        cmdhandler.powa()
-    elif cmd == "CURC":
-        channel = int(ss[1],0)
-        cmdhandler.curc(channel)
-    elif cmd == "CURA":
-        cmdhandler.cura()
-    elif cmd == "CURB":
-        cmdhandler.curb()
-    elif cmd == "GETA":
-        cmdhandler.geta()
-    elif cmd == "TEMP":
-        cmdhandler.temp()
- 
-    else:
-        r=cmdhandler.sendarxrecv(cmd)
-        tf,r = checkack(r)
-        if tf:
-            print (r[1:])
+    if cmd in specialargs:
+        try:
+            return specialargs[cmd](ss)
+        except (ValueError,IndexError):
+            print("invalid arguments for %s: %s"%(cmd," ".join(ss[1:])))
+            return None
+    entry = arxregistry.commands.get(cmd)
+    if entry is None:
+        return ('command',(cmd,))
+    try:
+        values = [int(v,0) for v in ss[1:]]
+    except ValueError:
+        print("invalid number for %s: %s"%(cmd," ".join(ss[1:])))
+        return None
+    required = len([f for f in entry.fields if not f[1]])
+    if len(values) < required or len(values) > len(entry.fields):
+        print("%s expects %d to %d numbers (%s)"%(cmd,required,len(entry.fields),entry.args))
+        return None
+    for (width,optional),v in zip(entry.fields,values):
+        if v < 0 or v >= 16**width:
+            print("%s: %d out of range (%d hex digits)"%(cmd,v,width))
+            return None
+    method = cmd.lower()
+    if hasattr(arxcmds.arxcmd,method):
+        if entry.repeat:
+            return (method,(values,))
+        return (method,tuple(values))
+    return ('command',(cmd+"".join(["%0*X"%(width,v) for (width,optional),v in zip(entry.fields,values)]),))
+
+def echoargs(ss):
+    """ concatenate everything after the command as the argument"""
+    return ('echo',(" ".join(ss[1:]),))
+
+def stimargs(ss):
+    if len(ss)<2 or ss[1] == "NOW":
+        return ('stim',(None,))     # the time when it is sent
+    from dateutil.parser import parse
+    try:
+        timeval = parse(ss[1])
+    except ValueError:
+        print ("invalid date time format, try dd-mmm-yyyy hh:mm:ss")
+        return None
+    t = int(timeval.timestamp())
+    print("unix timestamp: %d "%t)
+    return ('stim',(t,))
+
+def commargs(ss):
+    if len(ss) <2:
+        return ('comm',())
+    addr = int(ss[1],0)
+    if len(ss)>2:
+        config = int(ss[2],0)//16    # given as the baud rate
+        return ('comm',(addr,config))
+    return ('comm',(addr,))
+
+""" commands whose typed arguments are not one number per field """
+specialargs = {'ECHO':echoargs, 'STIM':stimargs, 'COMM':commargs}
+
+def broadcastsafe(cmd):
+    """False for a command the dictionary does not allow to be broadcast"""
+    entry = arxregistry.commands.get(cmd)
+    return entry is None or entry.broadcast
 
         
     
@@ -404,7 +409,6 @@ def parsecmd(s,cmdhandler):
 set up bus
 """
 import os
-import time
 import sys
 import docopt
 
@@ -453,11 +457,26 @@ if __name__ == "__main__":
     cmdhandler.setErrorOutput(errorfile=errfile)
     #cmdhandler.debugprint("test debugprint")
     
+    if opts['--input']:
+        import arxscript
+        tf = arxscript.runfile(cmdhandler,opts['--input'],opts['--logfile'],
+                               compilecmd,arxmod.defaultaddress)
+        sys.exit(0 if tf else 1)
+    
+    logwriter = None
+    if opts['--logfile']:
+        import csv
+        import arxscript
+        logfile = open(opts['--logfile'],'w',newline='')
+        logwriter = csv.writer(logfile)
+        logwriter.writerow(arxscript.logcolumns)
+    lineno = 0
     echo = True
     while True:
         promptstr = "%d>"%arxmod.currentaddr
         try:
             s = input(promptstr).upper()
+            lineno += 1
         except EOFError:
             print("")
             print("end of input")
@@ -492,4 +511,12 @@ if __name__ == "__main__":
             print("pausing %5.2f second"%nsec)
             time.sleep(nsec)
             continue
-        parsecmd(s,cmdhandler)
+        if s == "!SCAN":
+            import arxscan
+            inventory = arxscan.scan(cmdhandler)
+            arxscan.show(inventory,cmdhandler.human)
+            continue
+        res = parsecmd(s,cmdhandler)
+        if logwriter and isinstance(res,arxcmds.arxresult):
+            logwriter.writerow(arxscript.logrow(lineno,res))
+            logfile.flush()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+arx archive
+
+Compact columnar archive of monitor sweeps, for the long term; arxring.py
+keeps the last minutes in memory.
+
+Each sweep of a fixed list of boards is one row.  Rows are gathered into
+chunks (default 300 rows, 5 minutes at a 1 s sweep) and each chunk is
+written as one .npz file of columns:
+    addr        (boards,) board addresses
+    t0, dt      time of the first row in ms since 1970, and the ms from each
+                row to the next (delta-encoded, uint32)
+    powa, cura  (rows,boards,16) ADC counts
+    curb, temp  (rows,boards) ADC counts
+    config      (rows,boards,16) channel configuration words, from the
+                command handler's shadow, 0xFFFF if unknown
+The ADC values are 10 bits, so each of those columns is bit-packed four
+values to five bytes, with a packed bitmap of the values that were not
+read; a column holding a value over 10 bits is kept as uint16 instead
+(<name>_bits gives which).  The file is deflated as well, which takes
+care of the configuration words that rarely change.
+
+For 44 boards, a 1 s sweep is about 3 kB a row before deflate, against
+some 12 kB as CSV text.
+
+Files roll over daily: chunks go in one directory per UTC day,
+<root>/YYYYMMDD/chunk-HHMMSS.npz, each written to a temporary name and
+renamed, so a reader never sees a partial chunk.
+
+Encoding and writing run on a thread of their own; add(), called on the
+polling thread (e.g. as the arxsweep callback), only queues the results.
+The queue is bounded: if the writer falls behind by more than maxqueue
+sweeps, further sweeps are dropped and counted.  A chunk that cannot be
+encoded or written is reported and counted, and the writer carries on.
+
+Created on Sun Oct 18 23:06:14 2026
+
+"""
+import datetime
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+chunkrows = 300         # sweeps per chunk file
+maxqueue = 1000         # sweeps waiting for the writer before they are dropped
+MISSING = 0xFFFF
+adccolumns = ('powa','cura','curb','temp')
+
+
+def pack10(v):
+    """bit-pack an array of values < 1024, four values to five bytes"""
+    v = np.asarray(v,dtype=np.uint64).ravel()
+    n = len(v)
+    v = np.concatenate([v,np.zeros((-n)%4,dtype=np.uint64)]).reshape(-1,4)
+    w = v[:,0] | (v[:,1]<<10) | (v[:,2]<<20) | (v[:,3]<<30)
+    return w.astype('<u8').view(np.uint8).reshape(-1,8)[:,:5].copy().ravel()
+
+def unpack10(b,n):
+    """the first n values of pack10 output b, as uint16"""
+    b = np.asarray(b,dtype=np.uint8).reshape(-1,5)
+    w = np.zeros((len(b),8),dtype=np.uint8)
+    w[:,:5] = b
+    w = w.view('<u8').ravel()
+    v = np.stack([(w>>s) & 0x3FF for s in (0,10,20,30)],axis=1)
+    return v.ravel()[:n].astype(np.uint16)
+
+def encodecolumn(name,v,columns):
+    """add column v (uint16, MISSING for no value) to dict columns, packed if it fits 10 bits"""
+    v = np.asarray(v,dtype=np.uint16)
+    missing = v == MISSING
+    columns[name+'_shape'] = np.array(v.shape,dtype=np.int32)
+    if (v[~missing] < 1024).all():
+        columns[name] = pack10(np.where(missing,0,v))
+        columns[name+'_missing'] = np.packbits(missing.ravel())
+        columns[name+'_bits'] = np.array(10,dtype=np.uint8)
+    else:
+        columns[name] = v
+        columns[name+'_bits'] = np.array(16,dtype=np.uint8)
+
+def decodecolumn(name,columns):
+    """inverse of encodecolumn"""
+    shape = tuple(columns[name+'_shape'])
+    if int(columns[name+'_bits']) == 16:
+        return np.asarray(columns[name],dtype=np.uint16).reshape(shape)
+    n = int(np.prod(shape))
+    v = unpack10(columns[name],n)
+    missing = np.unpackbits(columns[name+'_missing'],count=n).astype(bool)
+    v[missing] = MISSING
+    return v.reshape(shape)
+
+def readchunk(filename):
+    """read one chunk file.  Returns dict: t (rows,) Unix seconds, addr, and
+    the columns as uint16 arrays with MISSING for values not read.
+    """
+    with np.load(filename) as columns:
+        data = {'addr':columns['addr']}
+        ms = int(columns['t0']) + np.concatenate([[0],np.cumsum(columns['dt'],dtype=np.int64)])
+        data['t'] = ms/1000.0
+        for name in adccolumns+('config',):
+            data[name] = decodecolumn(name,columns)
+    return data
+
+def readday(root,day):
+    """all chunks of day (a datetime.date or 'YYYYMMDD') under root, joined
+    along the rows.  Chunks with a different board list are skipped.
+    Returns a dict as readchunk, or None if there are none.
+    """
+    if not isinstance(day,str):
+        day = day.strftime('%Y%m%d')
+    path = os.path.join(root,day)
+    try:
+        names = sorted([n for n in os.listdir(path) if n.startswith('chunk-') and n.endswith('.npz')])
+    except OSError:
+        return None
+    chunks = [readchunk(os.path.join(path,n)) for n in names]
+    if not chunks:
+        return None
+    addr = chunks[0]['addr']
+    chunks = [c for c in chunks if np.array_equal(c['addr'],addr)]
+    data = {'addr':addr}
+    for name in ('t',)+adccolumns+('config',):
+        data[name] = np.concatenate([c[name] for c in chunks])
+    return data
+
+
+class arxarchive():
+    """ class to archive sweeps of boards addrs under directory root
+
+    shadow is the arxcmds.arxcmd shadow (address -> 16 configurations) the
+    configuration words are taken from, or None.
+    """
+    def __init__(self,root,addrs,shadow=None,rows=chunkrows):
+        self.root = root
+        self.addrs = list(addrs)
+        self.shadow = shadow
+        self.rows = rows
+        self.queue = queue.Queue(maxqueue)
+        self.pending = []
+        self.day = None
+        self.errors = 0         # chunks not written
+        self.dropped = 0        # sweeps not queued, the writer being behind
+        self.thread = threading.Thread(target=self.run,name="arxarchive",daemon=True)
+        self.thread.start()
+
+    def add(self,results,t=None):
+        """queue one sweep: results as passed to the arxsweep callback"""
+        if t is None:
+            t = time.time()
+        configs = None
+        if self.shadow is not None:
+            configs = [list(self.shadow.get(addr,[None]*16)) for addr in self.addrs]
+        try:
+            self.queue.put_nowait((t,results,configs))
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        """write what is pending and stop the writer thread"""
+        self.queue.put(None)
+        self.thread.join()
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                self.flush()
+                return
+            t = item[0]
+            day = datetime.datetime.fromtimestamp(t,datetime.timezone.utc).date()
+            if self.day is not None and day != self.day:
+                self.flush()
+            self.day = day
+            self.pending.append(item)
+            if len(self.pending) >= self.rows:
+                self.flush()
+
+    def row(self,results,configs):
+        """the values of one sweep as arrays, MISSING where not read"""
+        nb = len(self.addrs)
+        powa = np.full((nb,16),MISSING,dtype=np.uint16)
+        cura = np.full((nb,16),MISSING,dtype=np.uint16)
+        curb = np.full(nb,MISSING,dtype=np.uint16)
+        temp = np.full(nb,MISSING,dtype=np.uint16)
+        config = np.full((nb,16),MISSING,dtype=np.uint16)
+        for i,addr in enumerate(self.addrs):
+            board = results.get(addr,{})
+            res = board.get('POWA')
+            if res:
+                powa[i] = res.value
+            res = board.get('CURA')
+            if res:
+                cura[i] = res.value
+            res = board.get('CURB')
+            if res:
+                curb[i] = res.value
+            res = board.get('TEMP')
+            if res:
+                temp[i] = res.value
+            if configs:
+                config[i] = [MISSING if c is None else c for c in configs[i]]
+        return powa,cura,curb,temp,config
+
+    def flush(self):
+        """encode the pending rows and write them as one chunk"""
+        if not self.pending:
+            return
+        rows = self.pending
+        self.pending = []
+        start = datetime.datetime.fromtimestamp(rows[0][0],datetime.timezone.utc)
+        path = os.path.join(self.root,start.strftime('%Y%m%d'))
+        name = start.strftime('chunk-%H%M%S')
+        filename = os.path.join(path,name+'.npz')
+        try:
+            columns = self.encode(rows)
+            os.makedirs(path,exist_ok=True)
+            n = 0
+            while os.path.exists(filename):     # e.g. a flush at close just after a full chunk
+                n += 1
+                filename = os.path.join(path,"%s-%d.npz"%(name,n))
+            tmp = filename+".tmp"
+            with open(tmp,'wb') as f:
+                np.savez_compressed(f,**columns)
+            os.replace(tmp,filename)
+        except Exception as e:      # the writer thread must not die
+            self.errors += 1
+            print("unable to write %s: %s"%(filename,e))
+
+    def encode(self,rows):
+        """the columns of a chunk of rows (time, results, configs) as a dict of arrays"""
+        ms = np.array([int(round(t*1000)) for t,results,configs in rows],dtype=np.int64)
+        values = [self.row(results,configs) for t,results,configs in rows]
+        columns = {'addr':np.array(self.addrs,dtype=np.uint8),
+                   't0':np.array(ms[0],dtype=np.int64),
+                   'dt':np.diff(ms).astype(np.uint32)}
+        for j,name in enumerate(adccolumns+('config',)):
+            if name == 'config':
+                columns[name] = np.stack([v[j] for v in values])
+                columns[name+'_bits'] = np.array(16,dtype=np.uint8)
+                columns[name+'_shape'] = np.array(columns[name].shape,dtype=np.int32)
+            else:
+                encodecolumn(name,np.stack([v[j] for v in values]),columns)
+        return columns
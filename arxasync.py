@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+arx async
+
+asyncio versions of arx.arx485 and arxcmds.arxcmd, so that one event loop
+can drive several buses and serve clients without a thread per bus.
+
+The serial port is opened non-blocking and its file descriptor is watched
+with loop.add_reader, so waiting for a response does not block the loop.
+Where the loop cannot watch the port (e.g. Windows COM ports with the
+proactor loop), the blocking framed reader is run in the default executor
+instead.
+
+Transactions on one bus are serialized with an asyncio.Lock; use one
+aioarx485 per bus and as many aioarxcmd handlers as convenient.
+
+Created on Sun Oct 18 11:20:37 2026
+
+"""
+import asyncio
+import time
+import sys
+
+import serial
+
+import arx
+import arxcmds
+import arxframe
+import arxregistry
+
+
+class aioarx485:
+    """ asyncio counterpart of arx.arx485 """
+
+    def __init__(self,name,port,baudrate=19200):
+        self.name = name
+        self.serial=None
+        try:
+            self.serial = serial.Serial(
+                port = port,
+                baudrate = baudrate,
+                parity = serial.PARITY_NONE,
+                stopbits = serial.STOPBITS_ONE,
+                bytesize = serial.EIGHTBITS,
+                timeout = 0,
+                writeTimeout = 0
+                )
+        except serial.SerialException:
+            print("Serial port not found: %s"%port)
+        self.deadline = arxframe.responsetime
+        self.quietuntil = 0.0
+        self.asleep = False     # a SLEP was the last command sent
+        self.lastactivity = 0.0 # time.monotonic() of the last character on the bus
+        self.lock = asyncio.Lock()
+        self.buf = bytearray()
+        self.nchars = arxframe.MAXRESPONSE
+        self.waiter = None
+        self.reader = False
+
+    def _startreader(self):
+        """watch the port from the event loop, if the loop can"""
+        if self.reader:
+            return True
+        try:
+            asyncio.get_running_loop().add_reader(self.serial.fileno(),self._onreadable)
+        except (NotImplementedError,AttributeError,ValueError):
+            return False
+        self.reader = True
+        return True
+
+    def _onreadable(self):
+        data = self.serial.read(self.serial.in_waiting or 1)
+        if not data:
+            return
+        self.buf += data
+        if self.waiter and not self.waiter.done():
+            idx = self.buf.find(arxframe.CR)
+            if idx > -1 or len(self.buf) >= self.nchars:
+                self.waiter.set_result(True)
+
+    async def send(self,addr,string):
+        s = bytearray('\0'+string+chr(13),'utf-8')
+        s[0]=addr+0x80       # put the address in.
+        wait = self.quietuntil - time.monotonic()
+        if wait > 0:         # bus still quiet after a broadcast or RSET
+            await asyncio.sleep(wait)
+        await self.wake()
+        self.serial.write(s)
+        tsent = arxframe.wiretime(len(s),self.serial.baudrate)
+        respond = arxframe.responsedeadline(addr,string)
+        if respond > 0:
+            self.deadline = tsent + respond + arxframe.latencymargin
+        else:
+            self.deadline = 0.0
+            self.quietuntil = time.monotonic() + tsent + arxframe.broadcastpause
+        self.asleep = arxframe.putstosleep(string)
+        self.lastactivity = time.monotonic() + tsent
+
+    async def receive(self,nchars=arxframe.MAXRESPONSE,deadline=None):
+        """read one response, up to the CR or the deadline set by the last send"""
+        if deadline is None:
+            deadline = self.deadline
+        if deadline <= 0:
+            return b''
+        if not self._startreader():
+            return await asyncio.get_running_loop().run_in_executor(
+                    None,arxframe.readframe,self.serial,nchars,deadline)
+        self.nchars = nchars
+        self.waiter = asyncio.get_running_loop().create_future()
+        if self.buf:
+            self._onreadable()
+        try:
+            await asyncio.wait_for(self.waiter,deadline)
+        except asyncio.TimeoutError:
+            pass
+        self.waiter = None
+        idx = self.buf.find(arxframe.CR)
+        n = idx+1 if idx > -1 else min(len(self.buf),nchars)
+        s = bytes(self.buf[:n])
+        del self.buf[:n]
+        if s:
+            self.lastactivity = time.monotonic()
+        return s
+
+    async def wake(self,force=False):
+        """send the wake-up character and wait, if the boards may be asleep"""
+        if not (force or arxframe.mightsleep(self.asleep,self.lastactivity)):
+            return False
+        self.serial.write(arxframe.WAKEUP)
+        await asyncio.sleep(arxframe.wiretime(len(arxframe.WAKEUP),self.serial.baudrate)+arxframe.wakeuptime)
+        self.asleep = False
+        self.lastactivity = time.monotonic()
+        return True
+
+    async def sendrecv(self,addr,string,nchars=arxframe.MAXRESPONSE):
+        """one complete transaction, exclusive of other users of this bus"""
+        async with self.lock:
+            self.clear_buffers()
+            await self.send(addr,string)
+            return await self.receive(nchars)
+
+    def clear_buffers(self):
+        self.serial.reset_input_buffer()
+        self.serial.reset_output_buffer()
+        self.buf.clear()
+
+    def close(self):
+        if self.reader:
+            asyncio.get_running_loop().remove_reader(self.serial.fileno())
+            self.reader = False
+        self.serial.close()
+
+
+class aioarxcmd():
+    """ asyncio counterpart of the arxcmds.arxcmd query methods
+
+    Methods take the board address as an argument instead of using a
+    current address, since many coroutines may share one handler.
+    Results are returned as arxcmds.arxresult, as by arxcmds.arxcmd.
+    """
+    def __init__(self,bus):
+        self.bus = bus
+        self.errorfile = sys.stderr
+
+    def setErrorOutput(self,errorfile=None):
+        self.errorfile = errorfile
+
+    def debugprint(self,*args,**kwargs):
+        print(*args, file=self.errorfile, **kwargs)
+
+    async def sendarxrecv(self,addr,string,nchars=None):
+        if nchars is None:          # to the CR: a NAK may be longer than the reply
+            nchars = arxframe.MAXRESPONSE
+        r = await self.bus.sendrecv(addr,string,nchars)
+        if arx.debug:
+            self.debugprint("receive",addr,string,r)
+        return(r)
+
+    async def transact(self,addr,string,nchars=None):
+        """send command string to addr, return its arxresult (value not decoded)"""
+        t = time.monotonic()
+        r = await self.sendarxrecv(addr,string,nchars)
+        return(arxcmds.makeresult(addr,string,r,time.monotonic()-t))
+
+    def error(self,addr,string,message):
+        if arx.debug:
+            self.debugprint(message)
+        return(arxcmds.arxresult(addr,string,b'','error',message))
+
+    async def _fields(self,addr,string,nfields=16):
+        """send a command whose reply is 4-digit hex fields; the value is an array of them"""
+        res = await self.transact(addr,string)
+        if res:
+            res.value = arxcmds.replyfields(res,nfields)
+        return(res)
+
+    async def _field(self,addr,string,width=4):
+        """send a command whose reply is one hex field; the value is an int"""
+        res = await self.transact(addr,string)
+        if res:
+            res.value = arxcmds.replyfield(res,width)
+        return(res)
+
+    async def echo(self,addr,anystring):
+        n = arxregistry.maxtext('ECHO')
+        if n is not None and len(anystring)>n:
+            return(self.error(addr,'ECHO'+anystring,"string too long, max %d: %d"%(n,len(anystring))))
+        res = await self.transact(addr,'ECHO'+anystring)
+        if res:
+            res.value = arxcmds.replytext(res)
+        return(res)
+
+    async def arxn(self,addr):
+        res = await self.transact(addr,'ARXN')
+        if res:
+            arxcmds.decodearxn(res)
+        return(res)
+
+    async def anlg(self,addr,channel):
+        return(await self._field(addr,'ANLG'+"%02X"%channel))
+
+    async def last(self,addr):
+        res = await self.transact(addr,'LAST')
+        if res:
+            res.value = arxcmds.replytext(res)
+        return(res)
+
+    async def setc(self,addr,channel,config):
+        if channel<0 or channel>15:
+            return(self.error(addr,'SETC',"invalid channel number %d"%channel))
+        return(await self.transact(addr,'SETC'+"%01X%04X"%(channel,config)))
+
+    async def getc(self,addr,channel):
+        if channel<0 or channel>15:
+            return(self.error(addr,'GETC',"invalid channel number %d"%channel))
+        return(await self._field(addr,'GETC'+"%01X"%channel))
+
+    async def sets(self,addr,config):
+        return(await self.transact(addr,'SETS'+"%04X"%(config)))
+
+    async def seta(self,addr,configs):
+        if len(configs) != 16:
+            return(self.error(addr,'SETA',"must be an array or list of 16 configuration values"))
+        return(await self.transact(addr,'SETA'+"".join(["%04X"%c for c in configs])))
+
+    async def geta(self,addr):
+        return(await self._fields(addr,'GETA'))
+
+    async def powc(self,addr,channel):
+        return(await self._field(addr,'POWC'+"%01X"%channel))
+
+    async def powa(self,addr):
+        return(await self._fields(addr,'POWA'))
+
+    async def curc(self,addr,channel):
+        return(await self._field(addr,'CURC'+"%01X"%channel))
+
+    async def cura(self,addr):
+        return(await self._fields(addr,'CURA'))
+
+    async def curb(self,addr):
+        return(await self._field(addr,'CURB'))
+
+    async def temp(self,addr):
+        return(await self._field(addr,'TEMP'))
+
+    async def owte(self,addr):
+        res = await self.transact(addr,'OWTE')
+        if res:
+            res.value = arxcmds.replyfields(res,len(res.reply)//4)
+        return(res)
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Usage:
+  arxbaud [--port=<serialPort>] [--from=<baud>] [--to=<baud>] [--checks=<n>] <addr>...
+
+Options:
+  -p --port=<serialPort>   Serial port of the RS485 interface
+  -f --from=<baud>         Baud rate the boards are at now [default: 19200]
+  -t --to=<baud>           Baud rate to move them to [default: 115200]
+  -n --checks=<n>          ECHO commands each board must answer [default: 3]
+
+arx baud
+
+Move every board on a bus to a higher baud rate with COMM, one board at a
+time, checking each with ECHO at the new rate.
+
+The bus is half-duplex and every transaction is bound by the wire time, so
+the baud rate sets the cost of everything else; boards are delivered at
+19200.  In rev 1.7 of the Command Dictionary the baud rate can only be
+given to COMM together with an address, and COMM with arguments must not
+be broadcast, so each board is sent COMM with its own address.  The change
+is volatile: a reset or power cycle returns a board to its persistent rate.
+
+For each board, at the old rate: ECHO, then COMM.  The host port is then
+moved to the new rate and the board must answer checks ECHO commands.  If
+it does not, the upgrade falls back: every board already moved is sent
+COMM back to the old rate (or RSET if it does not answer that) and the host
+port is returned to the old rate.  After the last board, all boards are
+checked again at the new rate, with the same fall back on failure.
+
+Created on Sun Oct 18 17:40:12 2026
+
+"""
+import sys
+import time
+
+settletime = 0.010      # seconds after the COMM reply before using the new rate
+
+
+def baudcode(baud):
+    """the COMM baud rate code B for baud, 16*B Hz"""
+    B = int(round(baud/16.0))
+    if B < 1 or B > 0xFFFF:
+        raise ValueError("baud rate %d out of range for COMM"%baud)
+    return B
+
+def check(cmdhandler,addr,checks=3):
+    """True if board addr answers checks ECHO commands correctly"""
+    cmdhandler.setAddr(addr)
+    for i in range(checks):
+        s = "BAUD%d"%i
+        res = cmdhandler.echo(s)
+        if not res or s not in res.value:
+            return False
+    return True
+
+def moveboard(cmdhandler,addr,frombaud,tobaud,checks=3):
+    """move one board from frombaud to tobaud; the host port is left at tobaud.
+    Returns True if the board answers at tobaud.
+    """
+    bus = cmdhandler.bus
+    bus.setbaud(frombaud)
+    cmdhandler.setAddr(addr)
+    res = cmdhandler.comm(addr,baudcode(tobaud))
+    if not res:
+        cmdhandler.debugprint("address %d: COMM %s %s"%(addr,res.status,res.value))
+    time.sleep(settletime)
+    bus.setbaud(tobaud)
+    return check(cmdhandler,addr,checks)
+
+def rollback(cmdhandler,addrs,oldbaud,newbaud,checks=3):
+    """return boards addrs from newbaud to oldbaud, with RSET for any that
+    do not answer.  The host port is left at oldbaud.
+    Returns list of addresses that do not answer at oldbaud.
+    """
+    lost = []
+    for addr in addrs:
+        if moveboard(cmdhandler,addr,newbaud,oldbaud,checks):
+            continue
+        cmdhandler.setAddr(addr)
+        cmdhandler.bus.setbaud(newbaud)
+        cmdhandler.command('RSET')      # back to the persistent rate
+        cmdhandler.bus.setbaud(oldbaud)
+        time.sleep(settletime)
+        if not check(cmdhandler,addr,checks):
+            lost.append(addr)
+    cmdhandler.bus.setbaud(oldbaud)
+    return lost
+
+def upgrade(cmdhandler,addrs,baud,checks=3):
+    """upgrade - move boards addrs, and the host port, from the port's
+    current baud rate to baud.  See module documentation.
+    Returns (True,[]) on success, else (False, addresses that no longer answer)
+    with the host port and the other boards at the old rate.
+    """
+    bus = cmdhandler.bus
+    oldbaud = bus.serial.baudrate
+    baudcode(baud)                      # fail before anything is sent
+    moved = []
+    for addr in addrs:
+        bus.setbaud(oldbaud)
+        if not check(cmdhandler,addr,checks):
+            cmdhandler.debugprint("address %d does not answer at %d baud"%(addr,oldbaud))
+            return (False,rollback(cmdhandler,moved,oldbaud,baud,checks)+[addr])
+        if not moveboard(cmdhandler,addr,oldbaud,baud,checks):
+            cmdhandler.debugprint("address %d does not answer at %d baud, returning to %d"%(
+                    addr,baud,oldbaud))
+            return (False,rollback(cmdhandler,moved+[addr],oldbaud,baud,checks))
+        moved.append(addr)
+    bad = [addr for addr in moved if not check(cmdhandler,addr,checks)]
+    if bad:
+        cmdhandler.debugprint("addresses %s do not answer at %d baud, returning to %d"%(
+                bad,baud,oldbaud))
+        return (False,rollback(cmdhandler,moved,oldbaud,baud,checks))
+    return (True,[])
+
+
+if __name__ == "__main__":
+    import docopt
+    import arx
+    import arxcmds
+
+    opts = docopt.docopt(__doc__)
+    commname = opts['--port'] or "/dev/ttyUSB0"
+    bus = arx.arx485('bus',commname,baudrate=int(opts['--from']))
+    if not bus.serial:
+        print("unable to open 485 interface at",commname)
+        sys.exit(1)
+    cmdhandler = arxcmds.arxcmd()
+    cmdhandler.setBus(bus)
+    addrs = [int(a,0) for a in opts['<addr>']]
+    tf,lost = upgrade(cmdhandler,addrs,int(opts['--to']),int(opts['--checks']))
+    if tf:
+        print("%d boards at %d baud"%(len(addrs),bus.serial.baudrate))
+    else:
+        print("upgrade failed, bus at %d baud"%bus.serial.baudrate)
+        if lost:
+            print("not answering: %s"%lost)
+    sys.exit(0 if tf else 1)
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Usage:
+  arxbench [--port=<serialPort>] [--boards=<n>] [--repeat=<n>] [--baud=<baud>]... [--output=<jsonfile>] [--compare=<jsonfile>]
+
+Options:
+  -p --port=<serialPort>    Use this port instead of an emulated bus
+                            (an emulator or boards at addresses 1..n)
+  -n --boards=<n>           Number of boards, addresses 1..n [default: 44]
+  -r --repeat=<n>           Transactions per command [default: 50]
+  -b --baud=<baud>          Baud rate(s) to test [default: 19200 115200]
+  -o --output=<jsonfile>    Write results as JSON
+  -c --compare=<jsonfile>   Compare with results saved from another version
+
+arx bench
+
+Benchmark of bus throughput and command latency, using the arxcmds.arxcmd
+command set on an emulated bus (arxemulator) or a given port.
+
+For each baud rate, reports for each command the number of transactions,
+commands per second, p50/p95/p99 latency, characters sent and received,
+and the theoretical wire time of those characters; then the time for a
+full-array monitor sweep (arxsweep: POWA, CURA, CURB, TEMP on every
+board).  Efficiency is wire time / elapsed time, the fraction of the
+physical limit of the bus that is achieved.
+
+Created on Sun Oct 18 15:10:44 2026
+
+"""
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+
+import arx
+import arxcmds
+import arxframe
+import arxsweep
+
+""" commands to time: name, arxcmd method, arguments """
+commandset = [
+    ('ECHO','echo',('BENCHMARK',)),
+    ('ARXN','arxn',()),
+    ('POWA','powa',()),
+    ('CURA','cura',()),
+    ('CURB','curb',()),
+    ('TEMP','temp',()),
+    ('GETA','geta',()),
+    ('GETC','getc',(3,)),
+    ('SETC','setc',(3,0x8000)),
+    ('SETS','sets',(0x8000,)),
+    ('SETA','seta',([0x8000]*16,)),
+    ('POWC','powc',(3,)),
+    ('CURC','curc',(3,)),
+    ]
+
+
+class meteredbus():
+    """ wraps an arx485, counting characters and transactions """
+    def __init__(self,bus):
+        self.bus = bus
+        self.serial = bus.serial
+        self.reset()
+
+    def reset(self):
+        self.sent = 0
+        self.received = 0
+        self.transactions = 0
+
+    def send(self,addr,string):
+        self.sent += len(string)+2          # address byte and CR
+        self.transactions += 1
+        self.bus.send(addr,string)
+
+    def receive(self,nchars=arxframe.MAXRESPONSE,deadline=None):
+        r = self.bus.receive(nchars,deadline)
+        self.received += len(r)
+        return r
+
+    def clear_buffers(self):
+        self.bus.clear_buffers()
+
+    def wiretime(self):
+        return arxframe.wiretime(self.sent+self.received,self.serial.baudrate)
+
+
+def timecommand(cmdhandler,metered,method,args,addrs,repeat):
+    """run one command repeat times, cycling over addrs.  Returns dict of results"""
+    metered.reset()
+    latencies = np.zeros(repeat)
+    t0 = time.perf_counter()
+    for i in range(repeat):
+        cmdhandler.setAddr(addrs[i%len(addrs)])
+        t = time.perf_counter()
+        getattr(cmdhandler,method)(*args)
+        latencies[i] = time.perf_counter()-t
+    elapsed = time.perf_counter()-t0
+    wire = metered.wiretime()
+    return {
+        'transactions': metered.transactions,
+        'elapsed_s': elapsed,
+        'commands_per_s': repeat/elapsed,
+        'p50_ms': float(np.percentile(latencies,50))*1000,
+        'p95_ms': float(np.percentile(latencies,95))*1000,
+        'p99_ms': float(np.percentile(latencies,99))*1000,
+        'chars_sent': metered.sent,
+        'chars_received': metered.received,
+        'wire_s': wire,
+        'efficiency': wire/elapsed,
+        }
+
+def timesweep(cmdhandler,metered,addrs,repeat=3):
+    """time full monitor sweeps of addrs.  Returns dict of results"""
+    sweep = arxsweep.arxsweep(cmdhandler,addrs)
+    times = []
+    metered.reset()
+    for i in range(repeat):
+        t = time.perf_counter()
+        sweep.cycle()
+        times.append(time.perf_counter()-t)
+    wire = metered.wiretime()/repeat
+    return {
+        'boards': len(addrs),
+        'sweep_s': min(times),
+        'sweep_mean_s': sum(times)/repeat,
+        'budget_s': sweep.budget(),
+        'wire_s': wire,
+        'efficiency': wire/min(times),
+        }
+
+def runbench(port,addrs,bauds,repeat):
+    """run the benchmark at each baud rate.  Returns dict of results"""
+    results = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'boards': len(addrs),
+        'repeat': repeat,
+        'bauds': {},
+        }
+    for baud in bauds:
+        emulator = None
+        if port is None:
+            import arxemulator
+            emulator = arxemulator.arxemulator(addrs,baudrate=baud)
+            busport = emulator.start()
+        else:
+            busport = port
+        bus = arx.arx485('bench',busport,baudrate=baud)
+        if not bus.serial:
+            print("unable to open 485 interface at",busport)
+            sys.exit(1)
+        metered = meteredbus(bus)
+        cmdhandler = arxcmds.arxcmd(dneu=None)
+        cmdhandler.setBus(metered)
+        cmdhandler.setHumanOutput(None)
+        cmdhandler.setErrorOutput(open(os.devnull,'w'))
+        r = {'commands':{}}
+        with contextlib.redirect_stdout(io.StringIO()):
+            for name,method,args in commandset:
+                r['commands'][name] = timecommand(cmdhandler,metered,method,args,addrs,repeat)
+            r['sweep'] = timesweep(cmdhandler,metered,addrs)
+        results['bauds'][str(baud)] = r
+        bus.serial.close()
+        if emulator:
+            emulator.stop()
+    return results
+
+def report(results,old=None,file=sys.stdout):
+    for baud,r in results['bauds'].items():
+        print("%s baud, %d boards"%(baud,results['boards']),file=file)
+        print("  cmd   cmd/s  p50 ms  p95 ms  p99 ms  sent  recv  wire s  elapsed s  eff",file=file)
+        for name,c in r['commands'].items():
+            line = "  %4s %7.1f %7.2f %7.2f %7.2f %5d %5d %7.3f %10.3f %4.2f"%(
+                    name,c['commands_per_s'],c['p50_ms'],c['p95_ms'],c['p99_ms'],
+                    c['chars_sent'],c['chars_received'],c['wire_s'],c['elapsed_s'],c['efficiency'])
+            if old and baud in old['bauds'] and name in old['bauds'][baud]['commands']:
+                line += "  (%+.0f%% cmd/s)"%(100.0*(c['commands_per_s']/
+                            old['bauds'][baud]['commands'][name]['commands_per_s']-1))
+            print(line,file=file)
+        s = r['sweep']
+        line = "  sweep of %d boards: %.3f s (mean %.3f s), wire %.3f s, budget %.3f s, eff %.2f"%(
+                s['boards'],s['sweep_s'],s['sweep_mean_s'],s['wire_s'],s['budget_s'],s['efficiency'])
+        if old and baud in old['bauds']:
+            line += "  (%+.0f%%)"%(100.0*(s['sweep_s']/old['bauds'][baud]['sweep']['sweep_s']-1))
+        print(line,file=file)
+
+
+if __name__ == "__main__":
+    import docopt
+
+    opts = docopt.docopt(__doc__)
+    bauds = [int(b) for b in opts['--baud']]
+    if len(bauds) == 1 and ' ' in opts['--baud'][0]:
+        bauds = [int(b) for b in opts['--baud'][0].split()]
+    addrs = list(range(1,int(opts['--boards'])+1))
+    results = runbench(opts['--port'],addrs,bauds,int(opts['--repeat']))
+    old = None
+    if opts['--compare']:
+        with open(opts['--compare']) as f:
+            old = json.load(f)
+    report(results,old)
+    if opts['--output']:
+        with open(opts['--output'],'w') as f:
+            json.dump(results,f,indent=1)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+arx breaker
+
+Circuit breaker for boards that do not answer.
+
+A board that is unpowered or absent costs the full receive deadline for
+every command sent to it.  After threshold consecutive timeouts a board is
+quarantined: callers (e.g. arxsweep) skip it, and it is only sent an ECHO
+probe every probeperiod seconds.  When it answers a probe it is returned to
+service.  Only timeouts count; a board that NAKs or sends garbage is there.
+
+The state of each board is visible with state() and quarantined().
+
+Created on Sun Oct 18 20:52:37 2026
+
+"""
+import time
+
+threshold = 3           # consecutive timeouts before a board is quarantined
+probeperiod = 10.0      # seconds between probes of a quarantined board
+
+
+class arxbreaker():
+    """ class to track failing boards and quarantine them """
+
+    def __init__(self,threshold=threshold,probeperiod=probeperiod,errorfile=None):
+        self.threshold = threshold
+        self.probeperiod = probeperiod
+        self.errorfile = errorfile
+        self.failures = {}      # address -> consecutive timeouts
+        self.quarantine = {}    # address -> time.monotonic() of the next probe
+        self.since = {}         # address -> time.time() when quarantined
+
+    def allowed(self,addr):
+        """True if commands may be sent to board addr"""
+        return addr not in self.quarantine
+
+    def state(self,addr):
+        """'ok', 'failing' (some consecutive timeouts) or 'quarantined'"""
+        if addr in self.quarantine:
+            return 'quarantined'
+        if self.failures.get(addr,0):
+            return 'failing'
+        return 'ok'
+
+    def quarantined(self):
+        """addresses of the quarantined boards"""
+        return sorted(self.quarantine)
+
+    def record(self,res):
+        """record arxresult res.  Returns False if its board is now quarantined"""
+        addr = res.addr
+        if res.status != 'timeout':
+            if res.status != 'noreply':
+                self.failures.pop(addr,None)
+            return True
+        n = self.failures.get(addr,0)+1
+        self.failures[addr] = n
+        if n >= self.threshold and addr not in self.quarantine:
+            self.quarantine[addr] = time.monotonic()+self.probeperiod
+            self.since[addr] = time.time()
+            if self.errorfile:
+                print("address %d quarantined after %d timeouts"%(addr,n),file=self.errorfile)
+        return addr not in self.quarantine
+
+    def restore(self,addr):
+        """return board addr to service"""
+        self.quarantine.pop(addr,None)
+        self.since.pop(addr,None)
+        self.failures.pop(addr,None)
+
+    def due(self,now=None):
+        """quarantined addresses whose probe is due, longest waiting first"""
+        if now is None:
+            now = time.monotonic()
+        return [addr for t,addr in sorted([(t,addr) for addr,t in self.quarantine.items()])
+                if t <= now]
+
+    def probe(self,cmdhandler,addr):
+        """probe quarantined board addr with ECHO.  Returns True if it answered
+        and is back in service.  The handler's current address is kept.
+        """
+        current = cmdhandler.addr
+        cmdhandler.setAddr(addr)
+        res = cmdhandler.echo("PROBE")
+        cmdhandler.setAddr(current)
+        if res.status == 'timeout':
+            self.quarantine[addr] = time.monotonic()+self.probeperiod
+            return False
+        if self.errorfile:
+            print("address %d answers, back in service after %.0f s"%(
+                    addr,time.time()-self.since.get(addr,time.time())),file=self.errorfile)
+        self.restore(addr)
+        return True
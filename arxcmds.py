@@ -12,27 +12,127 @@ modified 10 Aug to change analog translations
                 Temperature is internally calibrated by processor
                 Power and current now print EU values too.
 modified 20210108 LRD: Fix reversal of SETA and SETS.
+modified 20261018: POWA, CURA, GETA and OWTE decode replies with hexfields()
+                (one vectorized NumPy step); stackreplies() for many boards.
+                Per-channel lines go to the human output, None to silence.
+modified 20261018: shadow of each board's channel configurations, kept by
+                GETA/GETC/SETC/SETA/SETS; configure() sends only the changes.
+modified 20261018: methods return an arxresult (address, command, reply,
+                decoded value, status, time) and print nothing; formatting
+                for people is in arxformat.py.
+modified 20261018: COMM implemented as in rev 1.7 of the dictionary.
+modified 20261018: translation table cached (see translateanalog); numpy and
+                xlrd imported only when needed.
+modified 20261018: each response is read to its exact length from arxregistry.
+                LOAD and SAVE take the memory index.
+modified 20261018: a broadcast reads nothing back; broadcast() and
+                lastsweep() confirm with LAST which boards received one.
+modified 20261018: SLEP.
+modified 20261018: receive deadlines learned from each board's latency
+                (arxlatency.py), within the dictionary deadlines.
+modified 20261018: ARXN decoded in full (boardinfo) as in rev 1.7.
+modified 20261018: OWSE, OWDC and OWSN.  owtearray() converts OWTE replies
+                of many boards to a (boards,16) array of channel temperatures.
+modified 20261018: replies found with arxframe.parsereply() (one scan, no
+                copy per garbage character); an acknowledged result keeps
+                the arxreply and its fields are decoded from the receive
+                buffer (replyfield, replyfields); raw is copied only if used.
+modified 20261018: responses are read to the CR again, since a NAK is longer
+                than an empty reply; makeresult() checks the length of an
+                acknowledged reply against arxregistry.datachars().
+modified 20261018: ECHO takes up to 74 characters and replies ECHO<anystring>
+                as in rev 1.7c; the limit comes from arxregistry.maxtext().
 
 @author: jimlux
 """
 import time  
-import datetime
+import hashlib
+import os
+import struct
 import arx
-import numpy as np
-from xlrd import open_workbook
+import arxframe
+import arxlatency
+import arxregistry
 import sys
 
 
+""" translation cache file layout, little-endian: a header, then for each
+    channel its number and the lengths of its pin, name and conversion,
+    followed by those strings in UTF-8.
+"""
+cachemagic = b'ARXT'
+cacheversion = 2
+cacheheader = struct.Struct('<4sHqq40sd3iI')    # magic version mtime size sha1 LSB Vgnd Vddbeta tempcal nchans
+cachechannel = struct.Struct('<iHHH')           # channel, bytes of pin, name, conv
+
 class translateanalog():
+    """ analog channel names and conversions to engineering units
+
+    The workbook is parsed once and the table kept in a cache file next to
+    it (<filename>.cache, see cacheheader); the cache is used while the
+    workbook's mtime and size, or failing those its SHA-1, are unchanged.
+    """
 
     def __init__(self,filename="analogChannelCodes.xls"):
         self.chans=[]
         self.pins=[]
         self.names=[]
         self.convs=[]
+        self.index={}           # channel -> position in the lists above
+        self.channels={}        # name -> channel
+        self.LSB = 4.0000       # defaults, used if there is no workbook
+        self.Vgnd = 100
+        self.Vddbeta= 4750
+        self.tempcal = -3484
+        if filename is None:    # no channel names, e.g. for benchmarks
+            return
+        st = os.stat(filename)
+        cachefile = filename+".cache"
+        table = self.readcache(cachefile,filename,st)
+        if table is None:
+            self.parse(filename)
+            table = {k:getattr(self,k) for k in self.tablekeys}
+            self.writecache(cachefile,table,st,filehash(filename))
+        else:
+            for k in self.tablekeys:
+                setattr(self,k,table[k])
+        self.index = {n:i for i,n in enumerate(self.chans)}
+        self.channels = {name:n for n,name in zip(self.chans,self.names)}
+
+    tablekeys = ('chans','pins','names','convs','LSB','Vgnd','Vddbeta','tempcal')
+
+    def readcache(self,cachefile,filename,st):
+        """the cached table for filename, or None if missing or stale"""
+        try:
+            with open(cachefile,'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        try:
+            mtime,size,sha1,table = unpacktable(data)
+        except (struct.error,UnicodeDecodeError,ValueError):
+            return None
+        if mtime == st.st_mtime_ns and size == st.st_size:
+            return table
+        if sha1 == filehash(filename):      # touched but not changed
+            self.writecache(cachefile,table,st,sha1)
+            return table
+        return None
+
+    def writecache(self,cachefile,table,st,sha1):
+        tmp = cachefile+".tmp"
+        try:
+            with open(tmp,'wb') as f:
+                f.write(packtable(table,st.st_mtime_ns,st.st_size,sha1))
+            os.replace(tmp,cachefile)
+        except (OSError,struct.error):
+            pass                # e.g. read-only directory, parse again next time
+
+    def parse(self,filename):
+        """read the channel table from the workbook"""
+        from xlrd import open_workbook
         wb= open_workbook(filename)
         for sheet in wb.sheets():
-            print(sheet.name)
             if sheet.name =="chanSel":
                 #print("loading channel names")
                 for row in range(0,10):
@@ -61,7 +161,7 @@ class translateanalog():
                         conv=""
                         sig = r[4]+":"+r[5]+":"+r[6]
                     self.chans.append(n)
-                    self.pins.append(pin)
+                    self.pins.append(str(pin))
                     self.names.append(sig)
                     self.convs.append(conv)
             if sheet.name == 'reading':
@@ -79,13 +179,16 @@ class translateanalog():
         
     def name(self,channel):
         
-        try:
-            idx = self.chans.index(channel)
-        except ValueError:
+        idx = self.index.get(channel)
+        if idx is None:
 
             return("Unknown channel")
 
         return (self.names[idx])
+    
+    def channel(self,name):
+        """channel number for a name as given by name(), None if unknown"""
+        return self.channels.get(name)
 
     """ series of functions to translate a value in range 0-4095 into
         engineering units.
@@ -137,7 +240,6 @@ def decodechannelconfig(v):
 
 
     """
-    print ("Decode channel config")
     lowpass = v & 1
     sigon = (v & 2)>>1 == lowpass
     hipass = v & 4
@@ -173,9 +275,294 @@ def bintohex(n):
     return("0123456789ABCDEF"[n])
 
 
+def filehash(filename):
+    with open(filename,'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+def packtable(table,mtime,size,sha1):
+    """the translation cache file contents for table (dict of
+    translateanalog.tablekeys) of a workbook with mtime, size and sha1
+    """
+    out = [cacheheader.pack(cachemagic,cacheversion,mtime,size,sha1.encode('ascii'),
+                            table['LSB'],table['Vgnd'],table['Vddbeta'],table['tempcal'],
+                            len(table['chans']))]
+    for n,pin,name,conv in zip(table['chans'],table['pins'],table['names'],table['convs']):
+        strings = [pin.encode('utf-8'),name.encode('utf-8'),conv.encode('utf-8')]
+        out.append(cachechannel.pack(n,*[len(b) for b in strings]))
+        out.extend(strings)
+    return b"".join(out)
+
+def unpacktable(data):
+    """inverse of packtable.  Returns (mtime,size,sha1,table); raises
+    struct.error or ValueError if data is not a cache of this version
+    """
+    magic,version,mtime,size,sha1,LSB,Vgnd,Vddbeta,tempcal,nchans = cacheheader.unpack_from(data,0)
+    if magic != cachemagic or version != cacheversion:
+        raise ValueError("not a translation cache, version %d"%cacheversion)
+    table = {'chans':[],'pins':[],'names':[],'convs':[],
+             'LSB':LSB,'Vgnd':Vgnd,'Vddbeta':Vddbeta,'tempcal':tempcal}
+    i = cacheheader.size
+    for c in range(nchans):
+        n,npin,nname,nconv = cachechannel.unpack_from(data,i)
+        i += cachechannel.size
+        strings = []
+        for length in (npin,nname,nconv):
+            if i+length > len(data):
+                raise ValueError("translation cache truncated")
+            strings.append(data[i:i+length].decode('utf-8'))
+            i += length
+        table['chans'].append(n)
+        table['pins'].append(strings[0])
+        table['names'].append(strings[1])
+        table['convs'].append(strings[2])
+    return mtime,size,sha1.decode('ascii'),table
+
+
+""" numpy is imported by the functions that use it, so that a script that
+    only sends commands does not pay for it.
+"""
+
+def hexdigits(buf,nfields,width):
+    """convert a buffer of nfields*width hex digits to a (nfields,width) array
+    of digit values, 0xFF for characters that are not upper case hex digits
+    """
+    import numpy as np
+    c = np.frombuffer(buf,dtype=np.uint8,count=nfields*width).reshape(-1,width)
+    d = np.full(c.shape,0xFF,dtype=np.uint8)
+    digit = (c >= 0x30) & (c <= 0x39)
+    d[digit] = c[digit]-0x30
+    letter = (c >= 0x41) & (c <= 0x46)
+    d[letter] = c[letter]-0x37
+    return d
+
+def hexfields(r,nfields=16,width=4,offset=1):
+    """hexfields - decode a reply <ACK>hhhh...hhhh<CR> into a uint16 array
+    r is the reply, any buffer; the fields start after offset characters
+    (the leading ACK).  Returns up to nfields values; if the reply is short,
+    only the complete fields are returned.
+    Fields containing invalid hex characters are returned as 0xFFFF.
+    """
+    import numpy as np
+    n = min(nfields,(len(r)-offset)//width)
+    if n <= 0:
+        return np.zeros(0,dtype=np.uint16)
+    d = hexdigits(memoryview(r)[offset:offset+n*width],n,width)
+    v = (d.astype(np.uint16) << (4*np.arange(width-1,-1,-1,dtype=np.uint16))).sum(axis=1,dtype=np.uint16)
+    v[(d==0xFF).any(axis=1)] = 0xFFFF
+    return v
+
+def stackreplies(replies,nfields=16,width=4):
+    """stackreplies - decode replies from many boards into a (boards,nfields) uint16 array
+    Each reply is as for hexfields.  Rows for replies that are missing,
+    not ACK, or too short are 0xFFFF.
+    """
+    import numpy as np
+    nchars = nfields*width
+    ok = np.array([r is not None and len(r)>nchars and r[0]==6 for r in replies],dtype=bool)
+    v = np.full((len(replies),nfields),0xFFFF,dtype=np.uint16)
+    if not ok.any():
+        return v
+    buf = b"".join([bytes(r[1:1+nchars]) for r,good in zip(replies,ok) if good])
+    d = hexdigits(buf,ok.sum()*nfields,width).reshape(-1,nfields,width)
+    good = (d.astype(np.uint16) << (4*np.arange(width-1,-1,-1,dtype=np.uint16))).sum(axis=2,dtype=np.uint16)
+    good[(d==0xFF).any(axis=2)] = 0xFFFF
+    v[ok] = good
+    return v
+
+def sensorchannels(sensormap,ndevices=None):
+    """sensorchannels - channel code (0-15) of each 1-wire sensor index as a
+    row of 16, -1 for none.  sensormap is the ARXN map (boardinfo.sensormap);
+    if ndevices (from OWDC) differs from its length, the map is not reliable
+    (see ARXN) and no sensor is placed.
+    """
+    row = [-1]*16
+    if ndevices is None or ndevices == len(sensormap):
+        row[:len(sensormap)] = sensormap[:16]
+    return row
+
+def owtearray(replies,chanmaps):
+    """owtearray - channel temperatures from the OWTE replies of many boards,
+    decoded and converted in one step.  Returns a (boards,16) float array in
+    C indexed by channel code, NaN where a channel has no sensor or a board
+    did not reply.  chanmaps has one row of sensorchannels() per board.
+    Each OWTE field is a signed 12b number in units of 1/16 C.
+    """
+    import numpy as np
+    nb = len(replies)
+    chanmaps = np.asarray(chanmaps,dtype=np.int16).reshape(nb,16)
+    buf = bytearray(b'0'*(nb*64))
+    valid = np.zeros((nb,16),dtype=bool)
+    for i,r in enumerate(replies):
+        if r is None or len(r) < 2 or r[0] != 6:
+            continue
+        n = min(16,(len(r)-1)//4)
+        buf[i*64:i*64+4*n] = r[1:1+4*n]
+        valid[i,:n] = True
+    d = hexdigits(bytes(buf),nb*16,4).reshape(nb,16,4)
+    v = (d.astype(np.int32) << (4*np.arange(3,-1,-1,dtype=np.int32))).sum(axis=2)
+    valid &= ~(d==0xFF).any(axis=2) & (chanmaps >= 0)
+    temps = (((v & 0xFFF) ^ 0x800) - 0x800)/16.0
+    out = np.full((nb,16),np.nan)
+    rows,cols = np.nonzero(valid)
+    out[rows,chanmaps[rows,cols]] = temps[rows,cols]
+    return out
+
+
+def planboard(configs,shadow):
+    """planboard - fewest commands to bring one board from shadow to configs
+    configs and shadow are lists of 16 configuration numbers; None in configs
+    means leave the channel alone, None in shadow means its value is unknown.
+    Returns a list of (method,args) for arxcmd, possibly empty.
+    """
+    changed = [i for i,c in enumerate(configs) if c is not None and shadow[i] != c]
+    if len(changed) == 0:
+        return []
+    if len(changed) == 1:
+        return [('setc',(changed[0],configs[changed[0]]))]
+    target = [shadow[i] if c is None else c for i,c in enumerate(configs)]
+    if None not in target:
+        if len(set(target)) == 1:
+            return [('sets',(target[0],))]
+        return [('seta',(target,))]
+    return [('setc',(i,configs[i])) for i in changed]
+
+
+class arxresult():
+    """ result of one command to one board
+    addr      board address, 0 for a broadcast
+    cmd       the command as sent, e.g. 'GETC3'; code is its first 4 characters
+    raw       the reply from the ACK or NAK through the CR, b'' if none
+    reply     for an acknowledged command, the arxframe.arxreply its fields
+              are decoded from; raw is copied from it only when asked for
+    value     decoded reply: int, uint16 array, string, or None if the reply
+              has no data.  For a NAK, the generic and reason codes ('31');
+              for an error, the message.
+    status    'ack', 'nak', 'timeout' (no reply), 'garbage' (no ACK or NAK),
+              'noreply' (broadcast or RSET, none expected), 'error' (not sent,
+              or the reply could not be decoded)
+    elapsed   seconds from sending the command to the end of the reply
+    A result is true if the board acknowledged the command.
+    Formatting for people is in arxformat.py.
+    """
+    __slots__ = ('addr','cmd','reply','_raw','value','status','elapsed')
+
+    def __init__(self,addr,cmd,raw=b'',status='ack',value=None,elapsed=0.0,reply=None):
+        self.addr = addr
+        self.cmd = cmd
+        self.reply = reply
+        self._raw = raw
+        self.status = status
+        self.value = value
+        self.elapsed = elapsed
+
+    @property
+    def code(self):
+        return self.cmd[:4]
+
+    @property
+    def raw(self):
+        if self._raw is None:
+            self._raw = self.reply.frame()
+        return self._raw
+
+    def __bool__(self):
+        return self.status == 'ack'
+
+    def __repr__(self):
+        return "arxresult(%d,%r,%r,%s,%r,%.4f)"%(self.addr,self.cmd,self.raw,
+                                                 self.status,self.value,self.elapsed)
+
+def makeresult(addr,string,r,elapsed=0.0):
+    """makeresult - arxresult for command string to addr given reply r.
+    The value is left None, except for a NAK where it is the error codes,
+    and for an acknowledged reply whose length is not the one the Command
+    Dictionary gives (see arxregistry.datachars), an 'error'.
+    """
+    if arxframe.responsedeadline(addr,string) == 0:
+        return arxresult(addr,string,bytes(r),'noreply',None,elapsed)
+    try:
+        reply = arxframe.parsereply(r)
+    except arxframe.arxnak as e:
+        return arxresult(addr,string,bytes(r[e.garbage:]),'nak',e.generic+e.reason,elapsed)
+    except arxframe.arxerror as e:
+        return arxresult(addr,string,bytes(r),e.status,None,elapsed)    # garbage kept to show
+    n = arxregistry.datachars(string)
+    if n is not None and len(reply) != n:
+        return arxresult(addr,string,None,'error',"reply of %d characters to %s, %d expected: %r"%(
+                len(reply),string[:4],n,reply.frame()),elapsed,reply)
+    return arxresult(addr,string,None,'ack',None,elapsed,reply)
+
+def badreply(res):
+    """mark res 'error' for a reply that cannot be decoded.  Returns the message"""
+    res.status = 'error'
+    res.value = "bad reply to %s: %r"%(res.code,res.raw)
+    return res.value
+
+def replyfield(res,width=4,offset=1):
+    """one hex field of an acknowledged reply as an int, offset characters
+    from the ACK; on a short or invalid reply the result is marked 'error'
+    and the message is returned, so res.value = replyfield(res) keeps it.
+    """
+    try:
+        return res.reply.field(0,width,offset-1)
+    except arxframe.arxerror:
+        return badreply(res)
+
+def replyfields(res,nfields=16):
+    """nfields 4-digit hex fields of an acknowledged reply as a uint16 array,
+    decoded from the receive buffer (see hexfields); a field that is not hex
+    is 0xFFFF.  A reply too short for nfields is marked 'error' as for
+    replyfield, so a good result always has all nfields values.
+    """
+    if len(res.reply) < nfields*4:
+        return badreply(res)
+    return hexfields(res.reply.data,nfields,offset=0)
+
+class boardinfo():
+    """ the board-specific data returned by ARXN """
+    __slots__ = ('serial','version','fiber','nsensors','sensormap')
+
+    def __init__(self,serial=0,version=0,fiber=0,nsensors=0,sensormap=()):
+        self.serial = serial        # 16b serial number
+        self.version = version      # software version code
+        self.fiber = fiber          # bit c-1 set if channel c is fiber coupled
+        self.nsensors = nsensors    # K, number of known temperature sensors
+        self.sensormap = list(sensormap)    # channel code (c-1) of each of the K sensors
+
+    def inputtype(self,channel):
+        """'fiber' or 'coax' for channel code 0-15"""
+        return 'fiber' if self.fiber & (1<<channel) else 'coax'
+
+    def __repr__(self):
+        return "boardinfo(serial=%d version=%04X fiber=%04X nsensors=%d sensormap=%s)"%(
+                self.serial,self.version,self.fiber,self.nsensors,self.sensormap)
+
+def decodearxn(res):
+    """decode the reply of an acknowledged ARXN result into a boardinfo value"""
+    serial = replyfield(res,4,1)
+    version = replyfield(res,4,5)
+    fiber = replyfield(res,4,9)
+    nsensors = replyfield(res,2,13)
+    if not res:
+        return res
+    digits = bytes(res.reply.data[14:30])
+    n = min(nsensors,16)
+    if len(digits) < n or digits[:n].strip(b"0123456789ABCDEF"):
+        res.status = 'error'
+        res.value = "bad sensor map in ARXN reply: %r"%res.raw
+        return res
+    res.value = boardinfo(serial,version,fiber,nsensors,[int(chr(c),16) for c in digits[:n]])
+    return res
+
+def replytext(res):
+    """the data of an acknowledged reply as a string, without ACK and CR"""
+    return res.reply.text().rstrip('\r\n')
+
+
 class arxcmd():
 
     def __init__(self,addr=None,bus=None,dneu="analogChannelCodes-modLux.xls"):
+        self.addr = None        # no default board until setAddr()
         if addr:
             self.addr = addr
         if bus:
@@ -184,6 +571,10 @@ class arxcmd():
         self.errorfile = sys.stderr
         self.human = sys.stdout
         self.outfile = None
+        self.ring = None
+        self.shadow = {}        # address -> list of 16 channel configs, None if unknown
+        self.elapsed = 0.0      # seconds taken by the last transaction
+        self.latency = arxlatency.latencyestimator()
     
     def setAddr(self,addr):
         self.addr = addr
@@ -197,17 +588,44 @@ class arxcmd():
     def setFileOutput(self,outputfile=None):
         self.outfile=outputfile
         
+    def setMetrics(self,metrics=None):
+        """record every transaction on this handler's bus in metrics (arxmetrics.arxmetrics)"""
+        self.bus.setMetrics(metrics)
+        
+    def setLatency(self,latency=None):
+        """learn receive deadlines with latency (an arxlatency.latencyestimator),
+        or None to always wait the dictionary deadline"""
+        self.latency=latency
+        
+    def setRing(self,ring=None):
+        """monitor values are staged in ring (an arxring.arxring) for the current address"""
+        self.ring=ring
+        
     def setErrorOutput(self,errorfile=None):
         self.errorfile = errorfile
         
     def debugprint(self,*args,**kwargs):
         print(*args, file=self.errorfile, **kwargs)
+        
+    def shadowof(self,addr=None):
+        """the shadow of the channel configurations of board addr (default current)"""
+        if addr is None:
+            addr = self.addr
+        return self.shadow.setdefault(addr,[None]*16)
+    
+    def invalidate(self,addr=None):
+        """forget the shadow configuration of one board, or all boards for a broadcast"""
+        if addr is None:
+            addr = self.addr
+        if addr == 0:
+            self.shadow.clear()
+        else:
+            self.shadow.pop(addr,None)
     
     def sendtoarx(self,string):
 
-        self.debugprint("send to arx %x,"%self.addr)
-        for c in string:
-            self.debugprint(" %x"%ord(c))
+        if arx.debug:
+            self.debugprint("send to arx %x, %s"%(self.addr,string))
         self.bus.clear_buffers()
         self.bus.send(self.addr,string)
     
@@ -216,15 +634,49 @@ class arxcmd():
         self.debugprint(resp)
         return (resp)
     
-    def sendarxrecv(self,string,nchars=80):
-        self.debugprint("sendarxrecv:",self.addr,string)
+    def sendarxrecv(self,string,nchars=None):
+        if nchars is None:          # to the CR: a NAK may be longer than the reply
+            nchars = arxframe.MAXRESPONSE
+        if self.addr == arxframe.BROADCAST:
+            nchars = 0              # no board answers a broadcast
+        if arx.debug:
+            self.debugprint("sendarxrecv:",self.addr,string)
+        self.bus.clear_buffers()    # drop anything left from an earlier reply
+        t = time.monotonic()
         self.bus.send(self.addr,string)
-        r = self.bus.receive(nchars)
-        self.debugprint("receive",r)
+        deadline = None
+        if self.latency and nchars:
+            baud = self.bus.serial.baudrate
+            limit = arxframe.commanddeadline(self.addr,string,baud)
+            expected = arxregistry.responsechars(string)
+            deadline = self.latency.deadline(self.addr,string,expected,baud,limit)
+        trecv = time.monotonic()
+        r = self.bus.receive(nchars,deadline)
+        tend = time.monotonic()
+        self.elapsed = tend-t
+        if self.latency and nchars:
+            self.latency.observe(self.addr,string,r,tend-trecv,baud,limit,deadline)
+        if arx.debug:
+            self.debugprint("receive",r)
         return(r)    
         
+    def transact(self,string,nchars=None):
+        """send command string to the current address, return its arxresult (value not decoded)"""
+        r = self.sendarxrecv(string,nchars)
+        return makeresult(self.addr,string,r,self.elapsed)
     
+    def error(self,string,message):
+        """arxresult for a command that was not sent"""
+        if arx.debug:
+            self.debugprint(message)
+        return arxresult(self.addr,string,b'','error',message)
     
+    def command(self,string):
+        """send any command string; the value is the reply text"""
+        res = self.transact(string)
+        if res:
+            res.value = replytext(res)
+        return res
     
     def echo(self,anystring):
         """
@@ -233,44 +685,44 @@ class arxcmd():
         syntax:
         <a>ECHO<anystring><CR>
         
-        <anystring> is a sequence of up to 58 printable ASCII characters other than <CR>.
+        <anystring> is a sequence of up to 74 printable ASCII characters other than <CR>
+        (the limit is arxregistry.maxtext('ECHO')).
         
         response:
-        <ACK><anystring><CR>
+        <ACK>ECHO<anystring><CR>
         
         This command should never fail.
         """
-        if len(anystring)>58:
-            print ("string too long, max 58: %d"%len(anystring))
-            return(False)
-        r=self.sendarxrecv('ECHO'+anystring,len(anystring)+9)
-        tf,r = arx.checkack(r)
-        if tf:
-            print ("ECHO returns:",r[1:])
-        return(tf)
+        n = arxregistry.maxtext('ECHO')
+        if n is not None and len(anystring)>n:
+            return self.error('ECHO'+anystring,"string too long, max %d: %d"%(n,len(anystring)))
+        res=self.transact('ECHO'+anystring)
+        if res:
+            res.value = replytext(res)
+        return(res)
     
     def arxn(self):
         """
-        ARXN  reply with the serial number of the ARX board
+        ARXN  reply with the serial number of the ARX board and other board-specific data.
         
         syntax:
         <a>ARXN<CR>
         
         response:
-        <ACK>hh<CR>
+        <ACK>hhhhssssffffnntt...t<CR>
         
-        hh is two HEX digits representing the serial number (00 to FF).
+        hhhh is 4 hex digits representing the 16b serial number (0x0000 to 0xFFFF);
+        ssss is 4 hex digits representing the on-board software version code;
+        ffff is 4 hex digits giving a bit string where each bit represents the input coupling of a signal channel, with 0 for coax-coupled and 1 for fiber coupled where bits 0:15 correspond to channels 1:16 respectively;
+        nn is an 8b unsigned integer K as 2 hex digits giving the number of known temperature sensors; and
+        tt...t is a string of 16 hex digits, one for each known temperature sensor in order of their index numbers, specifiying the channel (t = c-1) at which that sensor is located.  Only the first K of these are meaningful.
         
-        This commmand should never fail.
+        The value is a boardinfo.  This commmand should never fail.
         """
-        r= self.sendarxrecv('ARXN',nchars=7)
-        n=-1
-        tf,r=arx.checkack(r)
-        if tf:
-            s = r[1:3]
-            n = arx.hextoint(s)
-            print("ARX serial number %d %s"%(n,s))
-        return(n)
+        res= self.transact('ARXN')
+        if res:
+            decodearxn(res)
+        return(res)
     
     
     def anlg(self,channel):
@@ -293,61 +745,77 @@ class arxcmd():
         
         Invalid channel number.
         """
-        r= self.sendarxrecv('ANLG'+"%02X"%channel)
-        tf,r=arx.checkack(r)
-        n=-1
-        if tf:
-            
-            s = r[1:5]
-            n = arx.hextoint(s)
-    
-            print("Chan:%d DN:%d %6.0f mV"%(channel,n,self.t.mV(n)))
-        return(n)
+        res= self.transact('ANLG'+"%02X"%channel)
+        if res:
+            res.value = replyfield(res)
+        return(res)
     
     
-    def comm(self,newaddr,config=None):
+    def comm(self,newaddr=None,config=None):
         """
-        COMM   set RS485 address and baud rate
+        COMM   get persistent RS485 address and baud rate, and optionally change their non-persistent values.
         
         syntax:
-        <a>COMMa[<B>]<CR>
+        <a>COMM[aa][bbbb]<CR>
         
-        where a is a single ASCII character (anything other than NULL=0)
-              B is a 4-digit hex number giving an unsigned 16b value (optional).
-        The RS485 address is set to 0x80+a, so that future commands must start with that value to be recognized.  The baud rate is set to 16*B.  If the second argument is absent, the baud rate is unchanged.
+        where aa is a 2-character hex number giving an unsigned 8b value that represents the new address.  The MSB may or may not be set.
+              bbbb is a 4-digit hex number giving an unsigned 16b value B.  The baud rate is set to 16*B Hz.
         
-        CAUTION:  No check is made of the reasonableness of the arguments.
+        If the second argument is absent, the baud rate is unchanged.  If both arguments are absent, neither the address nor baud rate is changed.
         
-        response:
-        <ACK><CR>
+        The new address and/or baud rate are volatile.  After a reset or power cycle, they revert to the non-volatile values set when the board was initialized.
         
-        This command cannot fail, but giving unreasonable arguments may make future communication impossible until the processor is reset.  Normally this command is used only in the laboratory for inital setup of the board.
-        """
-        if config:
-            cmd = "COMM"+chr(newaddr)+"%04X"%config
-        else:
-            cmd = "COMM"+chr(newaddr)
-        print("DEBUG, Comm command:%s"%cmd)
+        CAUTION:  This command should not be broadcast unless it is known that only one board is connected to the bus, or no arguments are given.
+        
+        response, success:
+        <ACK>aabbbb<CR>
+        where aa is the persistent address from non-volatile memory, and
+              bbbb is the persistent baud rate code from non-volatile memory.
         
-        #r = self.sendarxrecv(cmd)
-        #tf,r=arx.checkack(r)
-        #return(tf)
-        return(True)
+        failure:
+        <NAK>31<CR>   Invalid address (not 1 to 126)
+        <NAK>32<CR>   Argument contains a non-hex character
+        <NAK>33<CR>   Attempt to change baud rate failed
+        
+        config is B; the new address defaults to the current one when only
+        the baud rate is to change.  The reply is sent at the old baud rate,
+        after which the host port must be changed too (arx485.setbaud, or
+        see arxbaud.py).  The value is (persistent address, persistent baud rate).
+        """
+        if newaddr is not None and self.addr == 0:
+            return self.error('COMM',"COMM with arguments must not be broadcast")
+        if config is not None and newaddr is None:
+            newaddr = self.addr
+        cmd = "COMM"
+        if newaddr is not None:
+            if newaddr<1 or newaddr>126:
+                return self.error('COMM',"invalid address %d (1-126)"%newaddr)
+            cmd += "%02X"%newaddr
+        if config is not None:
+            if config<1 or config>0xffff:
+                return self.error('COMM',"invalid baud rate code %d"%config)
+            cmd += "%04X"%config
+        res = self.transact(cmd)
+        if res:
+            aa = replyfield(res,2)
+            bbbb = replyfield(res,4,3)
+            if res:
+                res.value = (aa,bbbb*16)
+            if newaddr is not None and newaddr != self.addr:
+                self.shadow.pop(self.addr,None)     # the board is now at newaddr
+                if self.latency:
+                    self.latency.forget(self.addr)
+        return(res)
     
     def gtim(self):
-        r= self.sendarxrecv('GTIM')
-        tf,r=arx.checkack(r)
-        if tf:
-            if len(r)<10:
-                print("response to GTIM too short 10 expected, %d received: %s"%(len(r),r))
-                return -1
-            if len(r)>10:
-                print("response to GTIM too long 10 expected, %d received: %s"%(len(r),r))
-                return -1
-            n  = arx.hextoint(r[1:9])
-            print("time returned: %d %s"%(n,
-                    datetime.datetime.utcfromtimestamp(n).strftime('%Y-%m-%d %H:%M:%S')))
-            return n
+        res= self.transact('GTIM')
+        if res:
+            if len(res.reply) != 8:
+                res.status = 'error'
+                res.value = "response to GTIM 10 expected, %d received: %s"%(len(res.raw),res.raw)
+                return res
+            res.value = replyfield(res,8)
+        return res
         
           
     def stim(self,newtime=None):
@@ -380,12 +848,9 @@ class arxcmd():
             newtime = int(time.time())
         if newtime<0:
             """    current time is 5f06 188d, so high bit not set. """
-            print("negative time is not allowed: %d"%newtime)
-            return(False)
+            return self.error("STIM","negative time is not allowed: %d"%newtime)
         #print(newtime)
-        r= self.sendarxrecv("STIM%08X"%newtime)
-        tf,r=arx.checkack(r)
-        return(tf)
+        return self.transact("STIM%08X"%newtime)
         
     def last(self):
         """
@@ -403,22 +868,51 @@ class arxcmd():
         
         This command can be used to verify that a broadcast command was actually received, since the broadcast provides no acknowledgment.
         """
-        r=self.sendarxrecv('LAST')
-        print("LAST",r)
-        tf,r=arx.checkack(r)
-        if len(r)<11:
-            print("response too short")
-            return(False)
-        if tf:
-            t1 = r[1:9]
-            last=r[9:]
-            n  = arx.hextoint(t1)
-            try:
-                print("time returned: %d %s"%(n,
-                        datetime.datetime.utcfromtimestamp(n).strftime('%Y-%m-%d %H:%M:%S')))
-            except:
-                print("problem with decoding date code")
-            print("last cmd:%s"%last)
+        res=self.transact('LAST')
+        if res:
+            res.value = replytext(res)
+        return(res)
+    
+    def lastsweep(self,string,addrs):
+        """
+        lastsweep   LAST to each board of addrs in turn, to learn which of them
+        received the broadcast command string.  A board that did answers
+        'b' followed by the command, truncated to fit 80 characters.
+        
+        Returns dict of address -> True if the board received it, False if
+        its last command was something else, None if it did not answer LAST.
+        The current address is left unchanged.
+        """
+        addr = self.addr
+        expect = ('b'+string)[:arxframe.MAXRESPONSE-2]
+        received = {}
+        for a in addrs:
+            self.setAddr(a)
+            res = self.last()
+            received[a] = (res.value == expect) if res else None
+        self.setAddr(addr)
+        return received
+    
+    def broadcast(self,method,*args,confirm=None):
+        """
+        broadcast   send command method (e.g. 'sets') to every board at once
+        
+        Nothing is read back; the bus is left quiet for the 100 ms the
+        dictionary asks for before the next command is sent.  If confirm is
+        a list of addresses, they are then checked with lastsweep().
+        
+        Returns (arxresult, dict from lastsweep(), empty without confirm).
+        """
+        addr = self.addr
+        self.setAddr(arxframe.BROADCAST)
+        try:
+            res = getattr(self,method)(*args)
+        finally:
+            self.setAddr(addr)
+        received = {}
+        if confirm and res.status == 'noreply':
+            received = self.lastsweep(res.cmd,confirm)
+        return res,received
             
     def setc(self,channel,config):
         """
@@ -442,14 +936,15 @@ class arxcmd():
         <NAK>31<CR>  The number of argument characters was not 5.
         """
         if channel<0 or channel>15:
-            print ("invalid channel number %d"%channel)
-            return(False)
+            return self.error('SETC',"invalid channel number %d"%channel)
         if config<0 or config>0xffff:
-            print("invalid config %04X"%config)
-            return(False)
-        r=self.sendarxrecv('SETC'+"%01X%04X"%(channel,config))
-        tf,r=arx.checkack(r)
-        return(tf)
+            return self.error('SETC',"invalid config %04X"%config)
+        res=self.transact('SETC'+"%01X%04X"%(channel,config))
+        if res:
+            self.shadowof()[channel] = config
+        else:                   # may or may not have been applied
+            self.invalidate()
+        return(res)
 
     def getc(self,channel):
         """
@@ -478,19 +973,13 @@ class arxcmd():
 
         """
         if channel<0 or channel>15:
-            print ("invalid channel number %d"%channel)
-            return([])
-        r=self.sendarxrecv('GETC'+"%01X"%channel)
-        templist = []
-        tf,r=arx.checkack(r)
-        if tf:
-            
-            s = r[1:5]
-            n = arx.hextoint(s)
-            templist.append(n)
-            sdecode=decodechannelconfig(n)
-            print("%d %s %s"%(n,s,sdecode))
-        return(templist)
+            return self.error('GETC',"invalid channel number %d"%channel)
+        res=self.transact('GETC'+"%01X"%channel)
+        if res:
+            res.value = replyfield(res)
+            if res:
+                self.shadowof()[channel] = res.value
+        return(res)
 
     
     def sets(self,config):
@@ -506,9 +995,12 @@ class arxcmd():
         <ACK><CR>    Success.
         <NAK>31<CR>  The number of argument characters was not 4.
         """
-        r=self.sendarxrecv('SETS'+"%04X"%(config))
-        tf,r=arx.checkack(r)
-        return(tf)
+        res=self.transact('SETS'+"%04X"%(config))
+        if res:
+            self.shadow[self.addr] = [config]*16
+        else:                   # may or may not have been applied
+            self.invalidate()
+        return(res)
 
 
     def geta(self):
@@ -524,22 +1016,12 @@ class arxcmd():
         
         This command cannot fail.
         """
-        r=self.sendarxrecv('GETA')
-        templist = []
-        tf,r=arx.checkack(r)
-        if tf:
-                
-            for i in range(16):
-                if i*4+4+1 > len(r):
-                    print ("response too short at channel %d"%i)
-                    break
-                s = r[i*4+1:i*4+4+1]
-                n = arx.hextoint(s)
-                templist.append(n)
-                sdecode=decodechannelconfig(n)
-                print("%d %s %s"%(n,s,sdecode))
-            
-        return(templist)
+        res=self.transact('GETA')
+        if res:
+            res.value = replyfields(res)
+            if res:                     # 0xFFFF: channel could not be read
+                self.shadow[self.addr] = [None if n == 0xFFFF else int(n) for n in res.value]
+        return(res)
 
 
     
@@ -559,56 +1041,77 @@ class arxcmd():
         TODO: maybe this should be an array of config?
         """
         if len(configs) != 16:
-            print ("must be an array or list of 16 configuration values")
-            return(False)
+            return self.error('SETA',"must be an array or list of 16 configuration values")
         cc = ""
         for c in configs:
             cc += "%04X"%c
             
-        r=self.sendarxrecv('SETA'+cc)
-        tf,r=arx.checkack(r)
-        return(tf)
+        res=self.transact('SETA'+cc)
+        if res:
+            self.shadow[self.addr] = [int(c) for c in configs]
+        else:                   # may or may not have been applied
+            self.invalidate()
+        return(res)
 
     
-    def load(self):
+    def load(self,n=0):
         """
         LOAD       configure all signal channels to previously stored settings
         
         syntax:
-        <a>LOAD<CR>
+        <a>LOADn<CR>
+        where n='0', '1', or '2' is a single-character index to non-volatile memory.
         
         Read the configuration numbers for all 16 channels from on-board non-volatile memory and configure all channels accordingly.  This command can be broadcast.
         
         response:
-        <ACK><CR>
-        
-        This command cannot fail.
+        <ACK><CR>    success
+        <NAK>31<CR>  memory index out of range
+        <NAK>32<CR>  no data was stored at that memory index (configuration unchnaged)
+        <NAK>33<CR>  I2C bus timeout
+        <NAK>34<CR>  I2C bus slave failed to acknowledge
         """
-        r= self.sendarxrecv('LOAD')
+        res= self.transact('LOAD%d'%n)
+        self.invalidate()
+        return(res)
     
-        tf,r=arx.checkack(r)
-        if tf:
-            print("loaded")
-    
-    def save(self):
+    def save(self,n=0):
         """
         SAVE      save settings of all signal channels
         
         syntax:
-        <a>SAVE<CR>
+        <a>SAVEn<CR>
+        where n='0', '1', or '2' is a single-character index to non-volatile memory.
         
-        Write the current configuration numbers of all channels to on-board non-volatile memory.  This command can be broadcast.  These values will be automatically loaded at the next power cycle or reset.
+        Write the current configuration numbers of all channels to on-board non-volatile memory.  This command can be broadcast.  The values in cell 0 will be automatically loaded at the next power cycle or reset.
         
         response:
-        <ACK><CR>
-        
-        This command cannot fail.
+        <ACK><CR>      success
+        <NAK>31<CR>    memory index out of range
+        <NAK>32<CR>    write failed.  
         """
-        r= self.sendarxrecv('SAVE')
+        return self.transact('SAVE%d'%n)
     
-        tf,r=arx.checkack(r)
-        if tf:
-            print("saved")
+    def configure(self,configs):
+        """
+        configure   set the channels of the current board, sending only what changes
+        
+        configs is a list of 16 configuration numbers, or None for a channel
+        that is to be left alone.  Channels whose shadow already holds the
+        target value are skipped.  One changed channel is sent with SETC;
+        several are sent with one SETS or SETA if the configuration of every
+        channel is then known, otherwise with one SETC each.
+        
+        Returns True if every command sent succeeded (or none was needed).
+        """
+        if len(configs) != 16:
+            if arx.debug:
+                self.debugprint("must be an array or list of 16 configuration values")
+            return(False)
+        tf = True
+        for method,args in planboard(configs,self.shadowof()):
+            tf = bool(getattr(self,method)(*args)) and tf
+        return(tf)
     
     
     
@@ -628,20 +1131,12 @@ class arxcmd():
         
         This command cannot fail.
         """
-        if channel<0 or channel>16:
-            print("invalid channel number %d"%channel)
-            return([])
-        r= self.sendarxrecv('POWC'+bintohex(channel))
-        powerlist = []
-        tf,r=arx.checkack(r)
-        if tf:
-            
-            s = r[1:5]
-            n = arx.hextoint(s)
-            powerlist.append(n)
-            print("%d %5.2f (DN:%d)"%(channel,self.t.P(n),n))
-
-        return(powerlist)
+        if channel<0 or channel>15:
+            return self.error('POWC',"invalid channel number %d"%channel)
+        res= self.transact('POWC'+bintohex(channel))
+        if res:
+            res.value = replyfield(res)
+        return(res)
     
     def powa(self):
         """
@@ -658,21 +1153,12 @@ class arxcmd():
         
         This command cannot fail.
         """
-        r= self.sendarxrecv('POWA')
-        powerlist = []
-        tf,r=arx.checkack(r)
-        if tf:
-            print ("chan pwr string")
-            for i in range(16):
-                if i*4+4+1 > len(r):
-                    print("Response too short at channel %d"%i)
-                    break
-                s = r[i*4+1:i*4+4+1]
-                n = arx.hextoint(s)
-                powerlist.append(n)
-                print("%d %5.2f (DN:%d)"%(i,self.t.P(n),n))
-        
-        return(powerlist)
+        res= self.transact('POWA')
+        if res:
+            res.value = replyfields(res)
+            if self.ring and res:
+                self.ring.stage(self.addr,'powa',res.value)
+        return(res)
     
     def curc(self,channel):
         """
@@ -689,18 +1175,11 @@ class arxcmd():
         This command cannot fail.
         """
         if channel<0 or channel>15:
-            print("invalid channel number %d"%channel)
-            return([])
-        r= self.sendarxrecv('CURC'+bintohex(channel))
-        currlist = []
-        tf,r=arx.checkack(r)
-        if tf:
-            
-            s = r[1:5]
-            n = arx.hextoint(s)
-            currlist.append(n)
-            print("chan: %d %f5.2 A (DN:%d)"%(channel,self.t.I1(n),n))
-        return(currlist)
+            return self.error('CURC',"invalid channel number %d"%channel)
+        res= self.transact('CURC'+bintohex(channel))
+        if res:
+            res.value = replyfield(res)
+        return(res)
 
     
     def cura(self):
@@ -716,22 +1195,12 @@ class arxcmd():
         
         This command cannot fail.
         """
-        r= self.sendarxrecv('CURA')
-        currlist = []
-        tf,r=arx.checkack(r)
-
-        if tf:
-            
-            for i in range(16):
-                if i*4+4+1 > len(r):
-                    print("Response too short at channel %d"%i)
-                    break
-                s = r[i*4+1:i*4+4+1]
-                n = arx.hextoint(s)
-                currlist.append(n)
-                print("chan: %d %5.2f A (DN:%d)"%(i,self.t.I1(s),n))
-
-        return(currlist)
+        res= self.transact('CURA')
+        if res:
+            res.value = replyfields(res)
+            if self.ring and res:
+                self.ring.stage(self.addr,'cura',res.value)
+        return(res)
     
     def curb(self):
         """
@@ -744,16 +1213,12 @@ class arxcmd():
         <ACK>vvvvCR>
         where vvvv is a 16b unsigned number as 4 hex digits, proportional the total DC current drawn by circuitry on this ARX board.  A value of 4096 corresponds to 10A.  This current comes from the external 6V power supply, regulated to 5V on the board.
         """
-        r= self.sendarxrecv('CURB')
-        currlist = []
-        tf,r=arx.checkack(r)
-        if tf:
-            
-            s = r[1:5]
-            n = arx.hextoint(s)
-            currlist.append(n)
-            print("Board %5.2f A (DN:%d)"%(self.t.I2(n),n))
-        return(currlist)
+        res= self.transact('CURB')
+        if res:
+            res.value = replyfield(res)
+            if self.ring and res:
+                self.ring.stage(self.addr,'curb',[res.value])
+        return(res)
     
     
     def temp(self):
@@ -767,16 +1232,109 @@ class arxcmd():
         <a>vvvv<CR>
         where vvvv is a 16b unsigned integer as 4 hex digits, representing the internal chip temperature of the microcontroller on the board.  See separate documentation on converting this number to temperature units.
         """
-        r= self.sendarxrecv('TEMP')
-        templist = []
-        tf,r=arx.checkack(r)
-        if tf:
-            
-            s = r[1:5]
-            n = arx.hextoint(s)
-            templist.append(n)
-            print("%d %f"%(n,self.t.T(n)))
-        return(templist)
+        res= self.transact('TEMP')
+        if res:
+            res.value = replyfield(res)
+            if self.ring and res:
+                self.ring.stage(self.addr,'temp',[res.value])
+        return(res)
+    
+    def owse(self):
+        """
+        OWSE        find all 1-wire devices (again))
+        
+        Searches for devices on the 1-wire sensor bus.  Running this command should not be necessary, since it is done automatically at startup.
+        
+        This command may take up to 1000 ms to return a response.
+        
+        syntax:
+        <a>OWSE<CR>
+        
+        response:
+        <ACK>nn<CR>
+        where nn is an 8b unsigned integer as 2 hex digits, representing the number of 1-wire devices found.
+        <NAK>31    error communicating on 1-wire bus
+        """
+        res= self.transact('OWSE')
+        if res:
+            res.value = replyfield(res,2)
+        return(res)
+    
+    def owdc(self):
+        """
+        OWDC        return number of channel temperature sensors
+        
+        Returns the previously-stored value of the number of devices on the 1-wire sensor bus; no new search occurs because of this command.
+        
+        syntax:
+        <a>OWDC<CR>
+        
+        response:
+        <ACK>nn<CR>
+        where nn is an 8b unsigned integer as 2 hex digits, representing the number of channel temperature sensors.
+        
+        This command cannot fail.
+        """
+        res= self.transact('OWDC')
+        if res:
+            res.value = replyfield(res,2)
+        return(res)
+    
+    def owsn(self,n):
+        """
+        OWSN         return serial number of a channel temperature sensor
+        
+        syntax:
+        <a>OWSNn<CR>
+        where n is an index number (0 to N-1, where N is the number of sensors) as 1 hex digit.
+        
+        response:
+        <ACK>vvvvvvvvvvvvvvvv<CR>
+        where vvvvvvvvvvvvvvvv is the 64-bit serial number as 16 hex digits, MSB first.
+        <NAK>31  argument invalid
+        <NAK>32  argument out of range (> N-1).
+        """
+        if n<0 or n>15:
+            return self.error('OWSN',"invalid sensor index %d"%n)
+        res= self.transact('OWSN%X'%n)
+        if res:
+            res.value = replyfield(res,16)
+        return(res)
+    
+    def owte(self):
+        """
+        OWTE         return channel temperatures
+        
+        syntax:
+        <a>OWTE<CR>
+        
+        response:
+        <ACK>vvvv...vvvv<CR>
+        where vvvv is a 16b integer as 4 hex digits, representing measured temperature as a signed 12b number in units of .0625 C (4b after binary point).  There are N such values, in the order of the sensor's index number (see OWSN), where N is the number of sensors.
+        <NAK>31   no sensors available
+        <NAK>32   unable to read all sensors
+        
+        This command takes from ~800 to ~1000 ms to return a response.
+        """
+        res= self.transact('OWTE')
+        if res:
+            res.value = replyfields(res,len(res.reply)//4)
+        return(res)
+    
+    def slep(self):
+        """
+        SLEP         put board's microcontroller in low-power sleep state
+        
+        The processor is effectively stopped by this command.  It sends the response before sleeping (unless the command was broadcast).  Each board wakes up upon seeing the next level transition on its RS485 receive line.  The bus sends the wake-up character and waits 10 ms before the next command (see arx485.wake).
+        
+        syntax:
+        <a>SLEP<CR>
+        
+        response:
+        <ACK><CR>
+        (Command cannot fail.)
+        """
+        return self.transact('SLEP')
     
     
 if __name__ == "__main__":
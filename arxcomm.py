@@ -18,6 +18,12 @@ modified 15 Jul 2020 - jimlux - add wakeup function
                          when the preceeding clauses were written.
 	20210108 - LRD:  Changed timeout parameter in Serial.serial() call from 0.1 to 1.0.
         20210213 - LRD:  Simplified version, no parsing.
+	20261018 - receive() shares the framed reader in arxframe.py with arx.py.
+	20261018 - unused dateutil import removed.
+	20261018 - --input runs a script in batch, logging to --logfile (arxscript.py).
+	20261018 - arx485 wakes sleeping boards as arx.py does (arx485.wake).
+	20261018 - receive() takes a deadline for the first character, as arx.py.
+	20261018 - checkack() uses arxframe.parsereply(), as arx.py.
 
 @author: jimlux
 """
@@ -27,7 +33,10 @@ arxmod.defaultaddress= 0x2
 arxmod.currentaddr = arxmod.defaultaddress
 debug = False
 
+import time
 import serial
+import arxframe
+import arxformat
 #import arxcmds
 
 class arx485:
@@ -47,13 +56,17 @@ class arx485:
                 parity = serial.PARITY_NONE,
                 stopbits = serial.STOPBITS_ONE,
                 bytesize = serial.EIGHTBITS,
-                timeout = 1.0,
+                timeout = arxframe.responsetime,
                 writeTimeout = 0
                 )
         except serial.SerialException:
             print("Serial port not found: %s"%port)
         else:
             pass
+        self.deadline = arxframe.responsetime
+        self.quietuntil = 0.0
+        self.asleep = False     # a SLEP was the last command sent
+        self.lastactivity = 0.0 # time.monotonic() of the last character on the bus
         #self.clear_buffers()
         #self.incoming_data = ''
         #self.saved_data = []
@@ -61,13 +74,34 @@ class arx485:
     def send(self,addr,string):
         s = bytearray('\0'+string+chr(13),'utf-8')
         s[0]=addr+0x80       # put the address in.
+        wait = self.quietuntil - time.monotonic()
+        if wait > 0:         # bus still quiet after a broadcast or RSET
+            time.sleep(wait)
+        self.wake()
         n = self.serial.write(s)
+        # response deadline is counted from the last character on the wire
+        tsent = arxframe.wiretime(len(s),self.serial.baudrate)
+        respond = arxframe.responsedeadline(addr,string)
+        if respond > 0:
+            self.deadline = tsent + respond + arxframe.latencymargin
+        else:
+            self.deadline = 0.0
+            self.quietuntil = time.monotonic() + tsent + arxframe.broadcastpause
+        self.asleep = arxframe.putstosleep(string)
+        self.lastactivity = time.monotonic() + tsent
         if debug:
             print (s)
             print("%d characters sent"%n)
             
-    def receive(self,nchars):
-        s = self.serial.read_until(chr(13),nchars) #read until CR=13 or timeout.
+    def receive(self,nchars=arxframe.MAXRESPONSE,deadline=None,first=None):
+        """read one response, up to the CR or the deadline set by the last send.
+        first is an optional deadline for the first character (see arxframe.readframe).
+        """
+        if deadline is None:
+            deadline = self.deadline
+        s = arxframe.readframe(self.serial,nchars,deadline,first) #read until CR=13 or deadline.
+        if s:
+            self.lastactivity = time.monotonic()
         if debug:
             print('%d characters read'%len(s))
         return(s)
@@ -77,6 +111,18 @@ class arx485:
         r = self.receive(nchars)
         print(r)
         
+    def wake(self,force=False):
+        """send the wake-up character and wait, if the boards may be asleep
+        (see arxframe.mightsleep) or if force.  Returns True if it was sent.
+        """
+        if not (force or arxframe.mightsleep(self.asleep,self.lastactivity)):
+            return False
+        self.serial.write(arxframe.WAKEUP)
+        time.sleep(arxframe.wiretime(len(arxframe.WAKEUP),self.serial.baudrate)+arxframe.wakeuptime)
+        self.asleep = False
+        self.lastactivity = time.monotonic()
+        return True
+    
     def clear_buffers(self):
         self.serial.flushInput()
         self.serial.flushOutput()
@@ -132,48 +178,18 @@ def checkack(resparray):
     """ TODO: need to allow for line terminator variability?"""
 
     
-    #print(resparray)
-    if len(resparray)<1:
+    try:
+        reply = arxframe.parsereply(resparray)
+    except arxframe.arxtimeout:
         print("Timeout - String zero length")
         return (False,resparray)
-    
-    while len(resparray)>0:
-        
-        if resparray[0] == 6:         #ASCII ACK
-            return (True,resparray)
-        if resparray[0] == 0x15:      #ASCII NAK
-            if len(resparray)<2:
-                print("Malformed NAK, only 1 char long")
-                return (False,resparray)
-         
-            if resparray[1] == ord('1'):
-                print("Invalid command received by arx")
-            elif resparray[1] == ord('2'):
-                print("command too long, ignored")
-            elif resparray[1] == ord('3'):
-                if len(resparray)<3:
-                    print("malformed NAK, generic code 3, no remaining characters")
-                    return (False,resparray)
-                print("Command failed, reason: %s"%chr(resparray[2]))
-                if resparray[2] == ord('1'):
-                    print ("Invalid argument")
-                elif resparray[2] == ord('2'):
-                    print ("channel number out of range")
-                elif resparray[2] == ord('3'):
-                    print("I2C bus timeout")
-                elif resparray[2] == ord('4'):
-                    print("I2 bus device failed to acknowledge")
-                else:
-                    print("unknown reason")
-            else:
-                print("invalid generic error code as first char of NAK %s in string %s"%(resparray[1],resparray))
-
-            return (False,resparray)
-        #print("skipping character neither ack nor nak %d"%resparray[0])
-        resparray=resparray[1:]
-        
-    print("no response")
-    return (False,resparray)
+    except arxframe.arxnak as e:
+        print(arxformat.naktext(e.generic+e.reason))
+        return (False,resparray[e.garbage:])
+    except arxframe.arxgarbage:
+        print("no response")
+        return (False,resparray[len(resparray):])
+    return (True,resparray[reply.garbage:])
 
 
 def hextoint(string):
@@ -207,14 +223,12 @@ def arxhelp():
     print(" \\x08 is the BEL character")
     
 import datetime
-from dateutil.parser import parse
 
     
 """ initialization code
 set up bus
 """
 import os
-import time
 import sys
 import docopt
 
@@ -237,6 +251,16 @@ if __name__ == "__main__":
         print("unable to open 485 interface at",commname)
         sys.exit(1)
 
+    if opts['--input']:
+        import arxcmds
+        import arxscript
+        cmdhandler = arxcmds.arxcmd(dneu=None)
+        cmdhandler.setBus(arxmod.bus)
+        cmdhandler.setErrorOutput(errorfile=errfile)
+        tf = arxscript.runfile(cmdhandler,opts['--input'],opts['--logfile'],
+                               defaultaddr=arxmod.defaultaddress,sticky=False)
+        sys.exit(0 if tf else 1)
+
     #------MAIN COMMAND LOOP-----#
     echo = True
     while True:
@@ -312,6 +336,9 @@ if __name__ == "__main__":
         print("Address=",arxmod.currentaddr)
         r=sendarxrecv(cmd)
         #tf,r = checkack(r)
+        if len(r)==0:
+            print("no response")
+            continue
         s = str(r[1:])
         if r[0]==6:
             print("ACK",s)
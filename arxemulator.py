@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Usage:
+  arxemulator [--baud=<baud>] [--worst] <addr>...
+
+Options:
+  -b --baud=<baud>   Initial baud rate of the emulated boards [default: 19200]
+  -w --worst         Respond at the Command Dictionary deadlines
+                     (100 ms, or 1000 ms for OWSE/OWTE) instead of typical times
+
+arx emulator
+
+Emulates any number of ARX boards on one RS485 bus, using a pseudo-terminal
+so that arx.arx485 can open it like a real port (Linux and macOS only).
+The name of the port is printed at startup.
+
+Follows the ARX Command Dictionary rev 1.7c: address byte, <ACK>/<NAK>
+framing, no response to broadcasts or RSET, and the commands
+    ECHO ARXN ANLG COMM GTIM STIM LAST RSET SETC GETC SETS SETA GETA
+    LOAD SAVE POWC POWA CURC CURA CURB TEMP OWSE OWDC OWSN OWTE SLEP
+Monitor values are noisy but plausible; configurations are stored, so
+GETA/GETC read back what SET? wrote.
+
+Timing is emulated: a command is not acted on until its last character
+would have arrived at the board's baud rate, the response is delayed by a
+processing time, and response characters are paced at the byte time.  The
+board only understands the host if the host port is set to the board's
+baud rate.  A sleeping board (SLEP) loses characters that arrive within
+10 ms of the character that woke it.
+
+Created on Sun Oct 18 14:02:31 2026
+
+"""
+import os
+import pty
+import random
+import select
+import termios
+import threading
+import time
+import tty
+
+import arxframe
+
+ACK = b'\x06'
+NAK = b'\x15'
+CR = b'\r'
+
+""" typical processing times, seconds """
+typicaltime = {'OWTE':0.850, 'OWSE':0.600}
+typicaldefault = 0.002
+wakeuptime = 0.010
+
+""" termios speed constant -> baud rate """
+speeds = {}
+for b in (1200,2400,4800,9600,19200,38400,57600,115200,230400,460800,921600):
+    if hasattr(termios,'B%d'%b):
+        speeds[getattr(termios,'B%d'%b)] = b
+
+
+def ishex(s):
+    return len(s) > 0 and all([c in "0123456789ABCDEF" for c in s])
+
+
+class arxboard():
+    """ class for the state of one emulated ARX board """
+
+    def __init__(self,addr,serial=None,baudrate=19200,nsensors=None,fiber=0):
+        rng = random.Random(addr)
+        self.rng = rng
+        self.persistentaddr = addr
+        self.persistentbaud = baudrate
+        self.serial = addr if serial is None else serial
+        self.version = 0x0107
+        self.fiber = fiber          # bit per channel, 1 = fiber coupled input
+        if nsensors is None:
+            nsensors = rng.randint(12,16)
+        self.sensormap = rng.sample(range(16),nsensors)
+        self.sensorserials = [rng.getrandbits(56)<<8 | 0x28 for i in range(nsensors)]
+        self.sensortemps = [rng.uniform(25.0,40.0) for i in range(nsensors)]
+        self.memory = [None,None,None]
+        self.memory[0] = [0]*16
+        self.reset()
+
+    def reset(self):
+        self.addr = self.persistentaddr
+        self.baudrate = self.persistentbaud
+        self.configs = list(self.memory[0])
+        self.time = 0
+        self.last = ""
+        self.previous = ""
+        self.asleep = False
+        self.wokeat = 0.0
+
+    def adc(self,nominal,noise):
+        return max(0,min(1023,int(self.rng.gauss(nominal,noise))))
+
+    def command(self,code,args,broadcast):
+        """execute one command.  Returns the reply, without <CR>"""
+        self.last = ('b' if broadcast else 'n')+code+args
+        handler = getattr(self,'cmd_'+code,None)
+        if handler is None:
+            return NAK+b'10'
+        reply = handler(args)
+        return reply if reply is not None else NAK+b'31'
+
+    def cmd_ECHO(self,args):
+        return ACK+('ECHO'+args).encode()
+
+    def cmd_ARXN(self,args):
+        mapping = "".join(["%X"%c for c in self.sensormap]).ljust(16,'0')
+        return ACK+("%04X%04X%04X%02X%s"%(self.serial,self.version,self.fiber,
+                                            len(self.sensormap),mapping)).encode()
+
+    def cmd_ANLG(self,args):
+        if len(args) != 2 or not ishex(args):
+            return None
+        return ACK+("%04X"%self.adc(100,5)).encode()
+
+    def cmd_COMM(self,args):
+        if len(args) not in (0,2,6) or (args and not ishex(args)):
+            return NAK+b'32'
+        reply = ACK+("%02X%04X"%(self.persistentaddr,self.persistentbaud//16)).encode()
+        if len(args) >= 2:
+            newaddr = int(args[:2],16) & 0x7F
+            if newaddr < 1 or newaddr > 126:
+                return NAK+b'31'
+            self.addr = newaddr
+        if len(args) == 6:
+            self.newbaud = int(args[2:],16)*16
+        return reply
+
+    def cmd_GTIM(self,args):
+        return ACK+("%08X"%self.time).encode()
+
+    def cmd_STIM(self,args):
+        self.time = int(args,16) if ishex(args) else self.rng.getrandbits(32)
+        return ACK
+
+    def cmd_LAST(self,args):
+        return ACK+self.previous.encode()[:78]
+
+    def cmd_RSET(self,args):
+        self.reset()
+        return ACK
+
+    def cmd_SETC(self,args):
+        if len(args) != 5 or not ishex(args):
+            return None
+        self.configs[int(args[0],16)] = int(args[1:],16)
+        return ACK
+
+    def cmd_GETC(self,args):
+        if len(args) != 1 or not ishex(args):
+            return None
+        return ACK+("%04X"%self.configs[int(args,16)]).encode()
+
+    def cmd_SETS(self,args):
+        if len(args) != 4 or not ishex(args):
+            return None
+        self.configs = [int(args,16)]*16
+        return ACK
+
+    def cmd_SETA(self,args):
+        if len(args) != 64 or not ishex(args):
+            return None
+        self.configs = [int(args[i*4:i*4+4],16) for i in range(16)]
+        return ACK
+
+    def cmd_GETA(self,args):
+        return ACK+"".join(["%04X"%c for c in self.configs]).encode()
+
+    def cmd_LOAD(self,args):
+        if args not in ('0','1','2'):
+            return None
+        if self.memory[int(args)] is None:
+            return NAK+b'32'
+        self.configs = list(self.memory[int(args)])
+        return ACK
+
+    def cmd_SAVE(self,args):
+        if args not in ('0','1','2'):
+            return None
+        self.memory[int(args)] = list(self.configs)
+        return ACK
+
+    def power(self,channel):
+        on = self.configs[channel] & 0x8000
+        return self.adc(300 if on else 20,10)
+
+    def current(self,channel):
+        if not self.configs[channel] & 0x8000:
+            return self.adc(2,1)
+        return self.adc(60 if self.fiber & (1<<channel) else 250,5)
+
+    def cmd_POWC(self,args):
+        if len(args) != 1 or not ishex(args):
+            return None
+        return ACK+("%04X"%self.power(int(args,16))).encode()
+
+    def cmd_POWA(self,args):
+        return ACK+"".join(["%04X"%self.power(c) for c in range(16)]).encode()
+
+    def cmd_CURC(self,args):
+        if len(args) != 1 or not ishex(args):
+            return None
+        return ACK+("%04X"%self.current(int(args,16))).encode()
+
+    def cmd_CURA(self,args):
+        return ACK+"".join(["%04X"%self.current(c) for c in range(16)]).encode()
+
+    def cmd_CURB(self,args):
+        return ACK+("%04X"%self.adc(450,8)).encode()
+
+    def cmd_TEMP(self,args):
+        return ACK+("%04X"%int(self.rng.gauss(350,3))).encode()
+
+    def cmd_OWSE(self,args):
+        return ACK+("%02X"%len(self.sensormap)).encode()
+
+    def cmd_OWDC(self,args):
+        return ACK+("%02X"%len(self.sensormap)).encode()
+
+    def cmd_OWSN(self,args):
+        if len(args) != 1 or not ishex(args):
+            return None
+        n = int(args,16)
+        if n >= len(self.sensormap):
+            return NAK+b'32'
+        return ACK+("%016X"%self.sensorserials[n]).encode()
+
+    def cmd_OWTE(self,args):
+        if len(self.sensormap) == 0:
+            return NAK+b'31'
+        return ACK+"".join(["%04X"%(int(round(self.rng.gauss(t,0.1)*16)) & 0xFFFF)
+                             for t in self.sensortemps]).encode()
+
+    def cmd_SLEP(self,args):
+        self.asleep = True
+        return ACK
+
+
+class arxemulator():
+    """ class for a bus of emulated boards on a pseudo-terminal
+
+    boards is a list of addresses or of arxboard instances.
+    worst makes every response take as long as the Command Dictionary allows.
+    """
+    def __init__(self,boards,baudrate=19200,worst=False):
+        self.boards = {}
+        for b in boards:
+            if not isinstance(b,arxboard):
+                b = arxboard(b,baudrate=baudrate)
+            self.boards[b.addr] = b
+        self.worst = worst
+        self.master,self.slave = pty.openpty()
+        tty.setraw(self.master)
+        tty.setraw(self.slave)
+        attrs = termios.tcgetattr(self.slave)
+        speed = {v:k for k,v in speeds.items()}[baudrate]
+        attrs[4] = attrs[5] = speed
+        termios.tcsetattr(self.slave,termios.TCSANOW,attrs)
+        self.port = os.ttyname(self.slave)
+        self.running = False
+        self.thread = None
+        self.commands = 0
+
+    def hostbaud(self):
+        """baud rate the host has set on its end of the pty"""
+        return speeds.get(termios.tcgetattr(self.slave)[4],0)
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run,name="arxemulator",daemon=True)
+        self.thread.start()
+        return self.port
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join()
+        os.close(self.master)
+        os.close(self.slave)
+
+    def respond(self,board,reply,tstart):
+        """write a reply, starting at tstart and paced at the board's byte time"""
+        data = reply+CR
+        bytetime = arxframe.wiretime(1,board.baudrate)
+        i = 0
+        while i < len(data):
+            wait = tstart + i*bytetime - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            n = max(1,int((time.monotonic()-tstart)/bytetime)-i+1)
+            os.write(self.master,data[i:i+n])
+            i += n
+
+    def dispatch(self,frame,tstart,tend):
+        """act on one command frame: address byte, code and arguments (no CR)"""
+        addr = frame[0] & 0x7F
+        text = frame[1:].decode('ascii','replace')
+        code,args = text[:4],text[4:]
+        broadcast = addr == 0
+        targets = list(self.boards.values()) if broadcast else [self.boards.get(addr)]
+        self.commands += 1
+        for board in targets:
+            if board is None or board.baudrate != self.hostbaud():
+                continue
+            if tstart - board.wokeat < wakeuptime:
+                continue                # still waking up, command not received
+            board.previous = board.last
+            reply = board.command(code,args,broadcast)
+            if broadcast or code == 'RSET':
+                self.rekey()
+                continue
+            if self.worst:
+                delay = arxframe.responsedeadline(addr,code) - arxframe.wiretime(len(reply)+1,board.baudrate)
+            else:
+                delay = typicaltime.get(code,typicaldefault)
+            self.respond(board,reply,tend+max(delay,0.0))
+            self.rekey()
+
+    def rekey(self):
+        """apply address and baud changes made by COMM, after the reply"""
+        boards = {}
+        for b in self.boards.values():
+            if hasattr(b,'newbaud'):
+                b.baudrate = b.newbaud
+                del b.newbaud
+            boards[b.addr] = b
+        self.boards = boards
+
+    def run(self):
+        frame = None
+        tstart = 0.0
+        while self.running:
+            r,w,x = select.select([self.master],[],[],0.1)
+            if not r:
+                continue
+            try:
+                data = os.read(self.master,256)
+            except OSError:
+                break
+            tnow = time.monotonic()
+            for b in self.boards.values():
+                if b.asleep:            # any character wakes the processor
+                    b.asleep = False
+                    b.wokeat = tnow
+            for c in data:
+                if c & 0x80:
+                    frame = bytearray([c])
+                    tstart = tnow
+                elif frame is not None:
+                    if c == 13:
+                        # the host wrote the whole command at once, so its last
+                        # character reaches the board one command time from now
+                        tend = tstart + arxframe.wiretime(len(frame)+1,self.hostbaud() or 19200)
+                        self.dispatch(bytes(frame),tstart,tend)
+                        frame = None
+                    elif len(frame) < arxframe.MAXRESPONSE:
+                        frame.append(c)
+                    else:
+                        frame = None    # too long, ignored until the next address byte
+
+
+if __name__ == "__main__":
+    import docopt
+
+    opts = docopt.docopt(__doc__)
+    emulator = arxemulator([int(a,0) for a in opts['<addr>']],
+                           baudrate=int(opts['--baud']),worst=opts['--worst'])
+    print("emulating %d boards on %s"%(len(emulator.boards),emulator.start()))
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    print("%d commands"%emulator.commands)
+    emulator.stop()
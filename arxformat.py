@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+arx format
+
+Text for people from the arxcmds.arxresult returned by each arxcmd method.
+The command methods do no formatting or printing, so a poller that only
+wants the values pays nothing for this; the interactive programs call
+show() for each result.
+
+Created on Sun Oct 18 17:05:31 2026
+
+"""
+import datetime
+import sys
+
+import arxcmds
+
+""" NAK reason texts, from arx.checkack; generic code 3 is followed by a reason code """
+nakgeneric = {'1':"Invalid command received by arx",
+              '2':"command too long, ignored",
+              '3':"Command failed"}
+nakreason = {'1':"Invalid argument",
+             '2':"channel number out of range",
+             '3':"I2C bus timeout",
+             '4':"I2 bus device failed to acknowledge"}
+
+
+def naktext(codes):
+    """text for the NAK codes of a result, e.g. '31'"""
+    if len(codes) == 0:
+        return "Malformed NAK, only 1 char long"
+    if codes[0] not in nakgeneric:
+        return "invalid generic error code as first char of NAK %s"%codes
+    s = nakgeneric[codes[0]]
+    if codes[0] == '3':
+        if len(codes) < 2:
+            return "malformed NAK, generic code 3, no remaining characters"
+        s += ", reason: %s %s"%(codes[1],nakreason.get(codes[1],"unknown reason"))
+    return s
+
+def timetext(n):
+    try:
+        return "%d %s"%(n,datetime.datetime.utcfromtimestamp(n).strftime('%Y-%m-%d %H:%M:%S'))
+    except (ValueError,OverflowError,OSError):
+        return "%d (problem with decoding date code)"%n
+
+def degc(n):
+    """OWTE value, a signed 12b number in units of 1/16 C"""
+    return (((int(n) & 0xFFF) ^ 0x800) - 0x800)/16.0
+
+def arxntext(info):
+    """lines describing an arxcmds.boardinfo"""
+    lines = ["ARX serial number %d %04X, software version %04X"%(info.serial,info.serial,info.version),
+             "inputs: %s"%" ".join(["%d:%s"%(c+1,info.inputtype(c)) for c in range(16)])]
+    if info.nsensors:
+        lines.append("temperature sensors at channels: %s"%" ".join(["%d"%(t+1) for t in info.sensormap]))
+    else:
+        lines.append("no temperature sensor mapping")
+    return lines
+
+def channelof(res):
+    """channel number from the argument of a single-channel command"""
+    try:
+        return int(res.cmd[4:5],16)
+    except ValueError:
+        return -1
+
+
+""" formatters for acknowledged results: code -> function(res,t) returning lines """
+formatters = {
+    'ECHO': lambda res,t: ["ECHO returns: %s"%res.value],
+    'ARXN': lambda res,t: arxntext(res.value),
+    'ANLG': lambda res,t: ["Chan:%d DN:%d %6.0f mV"%(int(res.cmd[4:6],16),res.value,t.mV(res.value))],
+    'COMM': lambda res,t: ["persistent address %d, baud rate %d"%res.value],
+    'GTIM': lambda res,t: ["time returned: %s"%timetext(res.value)],
+    'LAST': lambda res,t: ["last cmd:%s"%res.value],
+    'GETC': lambda res,t: ["%d %04X %s"%(res.value,res.value,arxcmds.decodechannelconfig(res.value))],
+    'GETA': lambda res,t: ["%d %04X %s"%(n,n,arxcmds.decodechannelconfig(n)) for n in res.value],
+    'POWC': lambda res,t: ["%d %5.2f (DN:%d)"%(channelof(res),t.P(res.value),res.value)],
+    'POWA': lambda res,t: ["chan pwr string"]+["%d %5.2f (DN:%d)"%(i,t.P(n),n)
+                                               for i,n in enumerate(res.value)],
+    'CURC': lambda res,t: ["chan: %d %5.2f A (DN:%d)"%(channelof(res),t.I1(res.value),res.value)],
+    'CURA': lambda res,t: ["chan: %d %5.2f A (DN:%d)"%(i,t.I1(n),n) for i,n in enumerate(res.value)],
+    'CURB': lambda res,t: ["Board %5.2f A (DN:%d)"%(t.I2(res.value),res.value)],
+    'TEMP': lambda res,t: ["%d %f"%(res.value,t.T(res.value))],
+    'OWTE': lambda res,t: ["sensor %d %6.2f C (DN:%d)"%(i,degc(n),n) for i,n in enumerate(res.value)],
+    'OWSE': lambda res,t: ["%d 1-wire devices found"%res.value],
+    'OWDC': lambda res,t: ["%d channel temperature sensors"%res.value],
+    'OWSN': lambda res,t: ["sensor %s serial number %016X"%(res.cmd[4:],res.value)],
+    'LOAD': lambda res,t: ["loaded"],
+    'SAVE': lambda res,t: ["saved"],
+    }
+
+""" codes whose formatter takes a text value; for the others a text value is
+    the reply text from arxcmd.command, printed as it is
+"""
+textcodes = ('ECHO','LAST','LOAD','SAVE')
+
+
+def formatresult(res,t=None):
+    """formatresult - lines of text describing arxresult res.
+    t is the arxcmds.translateanalog for engineering units.
+    """
+    if t is None:
+        t = arxcmds.translateanalog(None)
+    if res.status == 'nak':
+        return [naktext(res.value)]
+    if res.status == 'timeout':
+        return ["Timeout - String zero length"]
+    if res.status == 'garbage':
+        return ["no response: %r"%res.raw]
+    if res.status == 'noreply':
+        return []
+    if res.status == 'error':
+        return [res.value]
+    f = formatters.get(res.code)
+    if f and (res.code in textcodes or not isinstance(res.value,str)):
+        return f(res,t)
+    if res.value is not None:
+        return ["%s"%res.value]
+    return []
+
+def show(res,t=None,file=sys.stdout):
+    """print the text for arxresult res to file; nothing if file is None"""
+    if file is None or res is None:
+        return
+    for line in formatresult(res,t):
+        print(line,file=file)
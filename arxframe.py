@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+arx frame
+
+Framing and timing of ARX command/response transactions, shared by the
+arx485 classes in arx.py and arxcomm.py.
+
+From the ARX Command Dictionary (rev 1.7c), SYNTAX section:
+    Response (success):  <ACK>[<reply>]<CR>
+    Response (failure):  <NAK><e><f><CR>
+    the whole response is at most 80 characters.
+    The last response character should be received no later than 100 ms
+    after the last command character is sent, unless the command description
+    gives a longer time (OWSE, OWTE: up to 1000 ms).
+    RSET produces no response.  A broadcast (address byte 0x80) produces no
+    response, and the controller should wait 100 ms before sending another
+    command.
+
+A board put to sleep with SLEP wakes at the next character on the bus but
+may lose it, so the controller sends one ASCII character (bit 7 clear) and
+waits at least 10 ms before the next command.  Each bus tracks when it was
+last active and whether a SLEP was sent, and wakes the boards only then or
+after a long idle period; an active bus pays nothing.
+
+parsereply() finds the frame in a receive buffer with one scan, without
+copying it, and raises arxtimeout, arxgarbage or arxnak (with the NAK codes)
+for a response that is not an acknowledgment.
+
+The response length and deadline of each command are read from the
+dictionary itself by arxregistry.py.
+
+Created on Sun Oct 18 09:12:40 2026
+
+"""
+import re
+import time
+
+import arxregistry
+
+CR = 13
+ACK = 6
+NAK = 0x15
+BROADCAST = 0           # address, sent as address byte 0x80
+MAXRESPONSE = 80        # characters, including <ACK> and <CR>
+
+responsetime = arxregistry.responsetime    # seconds, default response deadline
+longresponsetime = {code:e.deadline for code,e in arxregistry.commands.items()
+                    if e.deadline > responsetime}
+noresponse = tuple([code for code,e in arxregistry.commands.items() if e.noreply])
+broadcastpause = 0.100  # seconds of quiet after a broadcast
+latencymargin = 0.020   # seconds, allowance for the USB-RS485 adapter
+WAKEUP = b'!'           # wake-up character, any ASCII with bit 7 clear
+wakeuptime = 0.010      # seconds from the wake-up character to the next command
+idlesleep = 60.0        # seconds of silence after which boards may be asleep; None for never
+readslack = 0.005       # seconds a read may run past its deadline rather than set the port timeout again
+
+
+def wiretime(nchars,baud):
+    """time in seconds to send nchars on the bus.
+    Each character is 10 bits: start, 8 data, stop.
+    """
+    return nchars*10.0/baud
+
+def responsedeadline(addr,string):
+    """responsedeadline - seconds allowed after the last command character
+    for the complete response to arrive.  Zero if no response is expected.
+    """
+    if addr == BROADCAST:
+        return 0.0
+    e = arxregistry.lookup(string)
+    if e.noreply:
+        return 0.0
+    return e.deadline
+
+def commanddeadline(addr,string,baud):
+    """commanddeadline - seconds from the end of writing command string to
+    addr at baud (it may still be on the wire) until the complete response
+    must have arrived, as the bus computes it in send().  Zero if no
+    response is expected.
+    """
+    respond = responsedeadline(addr,string)
+    if respond <= 0:
+        return 0.0
+    return wiretime(len(string)+2,baud) + respond + latencymargin
+
+def putstosleep(string):
+    """True if command string puts its board(s) to sleep"""
+    return string[:4].upper() == 'SLEP'
+
+def mightsleep(asleep,lastactivity,now=None):
+    """mightsleep - True if boards on a bus may be asleep and need the
+    wake-up character: a SLEP was the last command (asleep), or nothing
+    has been on the bus since lastactivity for idlesleep seconds.
+    """
+    if asleep:
+        return True
+    if idlesleep is None:
+        return False
+    if now is None:
+        now = time.monotonic()
+    return now - lastactivity >= idlesleep
+
+def readframe(ser,nchars=MAXRESPONSE,deadline=responsetime,first=None):
+    """readframe - read one response from serial port ser.
+    Returns as soon as the terminating CR is received, nchars characters
+    have been received, or deadline seconds have elapsed, whichever is first.
+    If first is given, nothing is returned unless the first character
+    arrives within first seconds (e.g. to scan for boards quickly).
+    The returned bytes include the CR if one was received, and any
+    characters that arrived with it after the CR (not part of the frame,
+    see classify()).
+    Setting the port timeout reconfigures the port, so it is only set when
+    it is shorter than the time left, or longer by more than readslack.
+    """
+    buf = bytearray()
+    if deadline <= 0:
+        return bytes(buf)
+    tstart = time.monotonic()
+    tend = tstart + deadline
+    while len(buf) < nchars:
+        now = time.monotonic()
+        remaining = tend - now
+        if first is not None and len(buf) == 0:
+            remaining = min(remaining,tstart+first-now)
+        if remaining <= 0:
+            break
+        if ser.timeout is None or not remaining <= ser.timeout <= remaining+readslack:
+            ser.timeout = remaining
+        c = ser.read(1)                 # blocks until a character or timeout
+        if not c:
+            continue                    # the deadline is checked above
+        buf += c
+        if c[0] == CR:
+            break
+        n = min(ser.in_waiting, nchars-len(buf))
+        if n > 0:                       # take whatever else has arrived
+            buf += ser.read(n)
+            if buf.find(CR,len(buf)-n) > -1:
+                break
+    return bytes(buf)
+
+""" start and end of a response frame; re searches any buffer, including a memoryview """
+framestart = re.compile(b'[\x06\x15]')
+frameend = re.compile(b'\r')
+hexfield = re.compile(b'[0-9A-F]*')     # the digits of a reply field
+
+
+class arxerror(Exception):
+    """ a command did not get a good response """
+    status = 'error'
+
+class arxtimeout(arxerror):
+    """ nothing was received """
+    status = 'timeout'
+
+class arxgarbage(arxerror):
+    """ characters were received but no ACK or NAK among them """
+    status = 'garbage'
+
+    def __init__(self,nchars):
+        arxerror.__init__(self,"no ACK or NAK in %d characters"%nchars)
+        self.garbage = nchars
+
+class arxnak(arxerror):
+    """ the board refused the command; generic and reason are the NAK codes
+    as characters, '' if absent (see arxformat.naktext)
+    """
+    status = 'nak'
+
+    def __init__(self,generic,reason,garbage=0):
+        arxerror.__init__(self,"NAK %s%s"%(generic,reason))
+        self.generic = generic
+        self.reason = reason
+        self.garbage = garbage
+
+
+class arxreply():
+    """ an acknowledged response, without copying the receive buffer
+
+    buf is a memoryview of the buffer; the data are buf[start:end], between
+    the ACK and the CR (or the end of the buffer); garbage is the number of
+    characters skipped before the ACK.
+    """
+    __slots__ = ('buf','start','end','garbage')
+
+    def __init__(self,buf,start,end,garbage=0):
+        self.buf = buf
+        self.start = start
+        self.end = end
+        self.garbage = garbage
+
+    @property
+    def data(self):
+        return self.buf[self.start:self.end]
+
+    def __len__(self):
+        return self.end-self.start
+
+    def frame(self):
+        """a copy of the frame, from the ACK through the CR if there is one"""
+        return bytes(self.buf[self.start-1:min(self.end+1,len(self.buf))])
+
+    def text(self):
+        return str(self.data,'ascii','replace')
+
+    def field(self,i,width=4,offset=0):
+        """field i of width hex digits after offset characters of data, as an int"""
+        a = self.start+offset+i*width
+        if a+width > self.end:
+            raise arxerror("reply too short for field %d"%i)
+        if not hexfield.fullmatch(self.buf,a,a+width):
+            raise arxerror("not hex: %r"%bytes(self.buf[a:a+width]))
+        return int(str(self.buf[a:a+width],'ascii'),16)
+
+    def __repr__(self):
+        return "arxreply(%r)"%bytes(self.data)
+
+def parsereply(r):
+    """parsereply - find the response frame in receive buffer r (bytes,
+    bytearray or memoryview) with one scan.  Returns an arxreply, or
+    raises arxtimeout (empty), arxgarbage (no ACK or NAK) or arxnak.
+    """
+    buf = memoryview(r)
+    n = len(buf)
+    if n == 0:
+        raise arxtimeout("no response")
+    m = framestart.search(buf)
+    if m is None:
+        raise arxgarbage(n)
+    i = m.start()
+    m = frameend.search(buf,i+1)
+    end = m.start() if m else n
+    if buf[i] == NAK:
+        generic = chr(buf[i+1]) if end > i+1 else ''
+        reason = chr(buf[i+2]) if end > i+2 else ''
+        raise arxnak(generic,reason,i)
+    return arxreply(buf,i+1,end,i)
+
+def classify(r):
+    """classify a response.  Returns (status,generic,reason,garbage)
+    status is 'ack', 'nak', 'timeout' (nothing received) or 'garbage'
+    (neither ACK nor NAK found); generic and reason are the NAK codes as
+    characters ('' if absent); garbage is the number of characters outside
+    the frame, before the ACK or NAK and after the CR.
+    """
+    buf = memoryview(r)
+    try:
+        reply = parsereply(buf)
+    except arxnak as e:
+        return ('nak',e.generic,e.reason,e.garbage+trailing(buf,e.garbage))
+    except arxgarbage as e:
+        return ('garbage','','',e.garbage)
+    except arxtimeout:
+        return ('timeout','','',0)
+    return ('ack','','',reply.garbage+trailing(buf,reply.garbage))
+
+def trailing(buf,i):
+    """number of characters after the CR of the frame starting at buf[i]"""
+    m = frameend.search(buf,i+1)
+    return len(buf)-m.end() if m else 0
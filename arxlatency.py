@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+arx latency
+
+Receive deadlines for each board learned from the latency of its replies.
+
+The Command Dictionary allows every board 100 ms (1000 ms for OWSE/OWTE)
+to respond, but a healthy board answers in a few ms, so waiting the full
+time for a board that is missing makes every failed transaction cost the
+maximum.  For each board and command code, a latencyestimator keeps a
+moving average and mean deviation of the board's processing time: the
+time from sending the command to the end of the response, less the wire
+time of the command and response at the bus's baud rate.  The deadline
+for the next response is then
+
+    wire time + average + k * deviation + slack
+
+never more than the dictionary deadline (arxframe.commanddeadline), which
+the caller passes in with the baud rate.  The
+estimates are exponentially weighted as in TCP's retransmit timer, so a
+slow board on a long run gets a long deadline and a quick one a short
+deadline.  A response that misses a learned deadline doubles the deviation
+(back off), so a board that has become slower is not repeatedly timed out;
+a board that is gone reaches the dictionary deadline after a few misses.
+
+A late response is not waited for.  What arrives of it before the next
+command is sent is dropped by the clear of the input, but what arrives
+after is read as the next command's response.  That response usually has
+the wrong length or form and is marked 'error' or 'garbage' by
+arxcmds.makeresult(), but not always (e.g. two commands with the same
+reply format).  Such a mix-up only follows a learned-deadline miss, which
+the back off makes rare; use setLatency(None) on the command handler
+where it cannot be tolerated.
+
+Created on Sun Oct 18 20:11:06 2026
+
+"""
+import arxframe
+
+alpha = 0.125           # weight of a new sample in the average
+beta = 0.25             # weight of a new sample in the deviation
+k = 4                   # deviations of margin
+slack = 0.005           # seconds, added to every learned deadline
+minsamples = 4          # samples before the learned deadline is used
+
+
+class latencyestimator():
+    """ class for the learned processing time of each board and command
+
+    estimates maps (addr,code) -> [average, deviation, samples] in seconds.
+    """
+    def __init__(self):
+        self.estimates = {}
+
+    def wire(self,string,nchars,baud):
+        """wire time of command string and an nchars response at baud"""
+        return arxframe.wiretime(len(string)+2+nchars,baud)
+
+    def deadline(self,addr,string,nchars,baud,limit):
+        """deadline in seconds for the response to string, just sent to addr
+        at baud, never more than the dictionary deadline limit; None (use the
+        dictionary deadline) until learned.
+        """
+        e = self.estimates.get((addr,string[:4]))
+        if e is None or e[2] < minsamples:
+            return None
+        learned = self.wire(string,nchars,baud) + e[0] + k*e[1] + slack
+        return min(learned,limit)
+
+    def update(self,addr,string,seconds):
+        """add a processing time sample for string sent to addr"""
+        key = (addr,string[:4])
+        e = self.estimates.get(key)
+        if e is None:
+            self.estimates[key] = [seconds,seconds/2,1]
+            return
+        e[1] += beta*(abs(seconds-e[0])-e[1])
+        e[0] += alpha*(seconds-e[0])
+        e[2] += 1
+
+    def observe(self,addr,string,r,elapsed,baud,limit,deadline):
+        """account for one transaction: response r to string sent to addr at
+        baud, received in elapsed seconds with learned deadline (None if the
+        dictionary deadline limit was used).
+        """
+        if len(r) and r[-1] == arxframe.CR:
+            self.update(addr,string,max(0.0,elapsed-self.wire(string,len(r),baud)))
+            return
+        if deadline is None or deadline >= limit:
+            return
+        e = self.estimates.get((addr,string[:4]))
+        if e:
+            e[1] = min(2*e[1]+slack,limit)
+
+    def forget(self,addr=None):
+        """drop the estimates for one board, or all boards"""
+        if addr is None:
+            self.estimates.clear()
+            return
+        for key in [key for key in self.estimates if key[0] == addr]:
+            del self.estimates[key]
+
+    def report(self):
+        """lines of text: address, command, average and deviation in ms, samples"""
+        return ["%3d %s %7.2f %7.2f %d"%(addr,code,e[0]*1000,e[1]*1000,e[2])
+                for (addr,code),e in sorted(self.estimates.items())]
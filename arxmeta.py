@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Usage:
+  arxmeta [--port=<serialPort>] [--baud=<baud>] [--cache=<file>] [--refresh] [<addr>...]
+
+Options:
+  -p --port=<serialPort>   Serial port of the RS485 interface
+  -b --baud=<baud>         Baud rate of the boards [default: 19200]
+  -c --cache=<file>        Metadata cache file [default: arxmeta.json]
+  -r --refresh             Read every board again, even if its ARXN is unchanged
+
+arx meta
+
+Cache of the static data of each board, kept in a JSON file so that a
+program starting up does not read it all again:
+    serial, version, fiber, nsensors, sensormap   from ARXN
+    ndevices                                      from OWDC
+    owserials                                     from OWSN 0..ndevices-1
+None of this changes unless a board is replaced or reworked, and a board
+that is replaced answers ARXN differently, so one ARXN per board checks
+the cache; only a board whose ARXN reply differs from the cached one is
+read again.  An ARXN takes a few ms, against the OWDC and OWSN commands
+(and the ~1 s of OWSE, which is never sent: the board searches its
+1-wire bus at power up).
+
+The file is keyed by address:
+    {"version": 1, "boards": {"2": {"serial": 2, ..., "owserials": ["28FF...", ...],
+                                    "t": 1792345678.0}}}
+owserials are 16 hex digits, MSB first, as OWSN returns them.
+
+Without addresses, the boards already in the cache are checked.
+
+Created on Sun Oct 18 21:58:40 2026
+
+"""
+import json
+import os
+import sys
+import time
+
+import arxcmds
+
+metaversion = 1
+defaultfile = "arxmeta.json"
+arxnkeys = ('serial','version','fiber','nsensors','sensormap')
+
+
+class arxmeta():
+    """ class for the cached static data of the boards, by address """
+
+    def __init__(self,filename=defaultfile):
+        self.filename = filename
+        self.boards = {}        # address -> dict, see module documentation
+        self.load()
+
+    def load(self):
+        """read the cache file; a missing or unreadable file is an empty cache"""
+        try:
+            with open(self.filename) as f:
+                cache = json.load(f)
+        except (OSError,ValueError):
+            return
+        if not isinstance(cache,dict) or cache.get('version') != metaversion:
+            return
+        self.boards = {int(addr):entry for addr,entry in cache.get('boards',{}).items()}
+
+    def save(self):
+        cache = {'version':metaversion,
+                 'boards':{str(addr):entry for addr,entry in sorted(self.boards.items())}}
+        tmp = self.filename+".tmp"
+        try:
+            with open(tmp,'w') as f:
+                json.dump(cache,f,indent=1)
+            os.replace(tmp,self.filename)
+        except OSError as e:
+            print("unable to write %s: %s"%(self.filename,e))
+
+    def get(self,addr):
+        """the cached entry for board addr, or None"""
+        return self.boards.get(addr)
+
+    def info(self,addr):
+        """the cached ARXN data of board addr as an arxcmds.boardinfo, or None"""
+        entry = self.boards.get(addr)
+        if entry is None:
+            return None
+        return arxcmds.boardinfo(*[entry[k] for k in arxnkeys])
+
+    def matches(self,addr,info):
+        """True if the cache holds board addr with ARXN data info"""
+        entry = self.boards.get(addr)
+        return entry is not None and all([entry[k] == getattr(info,k) for k in arxnkeys])
+
+    def read(self,cmdhandler,addr,info):
+        """read the 1-wire data of board addr, whose ARXN data is info, into
+        the cache.  Returns the entry, or None if a command failed.
+        """
+        cmdhandler.setAddr(addr)
+        res = cmdhandler.owdc()
+        if not res:
+            return None
+        owserials = []
+        for n in range(res.value):
+            sn = cmdhandler.owsn(n)
+            if not sn:
+                return None
+            owserials.append("%016X"%sn.value)
+        entry = {k:getattr(info,k) for k in arxnkeys}
+        entry['ndevices'] = res.value
+        entry['owserials'] = owserials
+        entry['t'] = time.time()
+        self.boards[addr] = entry
+        return entry
+
+    def check(self,cmdhandler,addr,info,refresh=False):
+        """the entry for board addr given its ARXN data info (an
+        arxcmds.boardinfo), read again if it is not in the cache as it is.
+        Returns the entry, or None if the board could not be read.
+        """
+        if not refresh and self.matches(addr,info):
+            return self.boards[addr]
+        return self.read(cmdhandler,addr,info)
+
+    def validate(self,cmdhandler,addrs=None,refresh=False):
+        """validate - one ARXN to each board of addrs (default: those in the
+        cache), reading again the ones that changed.  Returns dict of
+        address -> entry for the boards that answered.  The cache file is
+        written if anything changed.
+        """
+        if addrs is None:
+            addrs = sorted(self.boards)
+        current = cmdhandler.addr
+        entries = {}
+        changed = False
+        for addr in addrs:
+            cmdhandler.setAddr(addr)
+            res = cmdhandler.arxn()
+            if not res:
+                continue
+            fresh = refresh or not self.matches(addr,res.value)
+            entry = self.check(cmdhandler,addr,res.value,refresh)
+            if entry is not None:
+                entries[addr] = entry
+                changed = changed or fresh
+        cmdhandler.setAddr(current)
+        if changed:
+            self.save()
+        return entries
+
+
+if __name__ == "__main__":
+    import docopt
+    import arx
+
+    opts = docopt.docopt(__doc__)
+    commname = opts['--port'] or "/dev/ttyUSB0"
+    bus = arx.arx485('bus',commname,baudrate=int(opts['--baud']))
+    if not bus.serial:
+        print("unable to open 485 interface at",commname)
+        sys.exit(1)
+    cmdhandler = arxcmds.arxcmd(dneu=None)
+    cmdhandler.setBus(bus)
+    meta = arxmeta(opts['--cache'])
+    addrs = [int(a,0) for a in opts['<addr>']] or None
+    t = time.monotonic()
+    entries = meta.validate(cmdhandler,addrs,opts['--refresh'])
+    for addr,entry in sorted(entries.items()):
+        print("%4d serial %d version %04X %d sensors: %s"%(addr,entry['serial'],entry['version'],
+                entry['ndevices']," ".join(entry['owserials'])))
+    print("%d boards in %.2f s"%(len(entries),time.monotonic()-t))
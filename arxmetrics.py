@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+arx metrics
+
+Counters and latency histograms for every bus transaction, by bus, command
+code and board address, in Prometheus text format.
+
+An arx485 given a metrics instance (arx485.setMetrics, or arxcmd.setMetrics
+for the handler's bus) records each transaction when its response is read:
+    arx_transactions_total          by status: ack, nak, timeout, noreply, garbage
+    arx_transaction_seconds         histogram, last command character sent
+                                    to response complete
+    arx_chars_sent_total
+    arx_chars_received_total
+    arx_naks_total                  by generic and reason code (see arx.checkack)
+    arx_garbage_chars_total         characters outside the ACK or NAK frame
+'noreply' is a broadcast or RSET, which has no response by design.
+
+Publish with writefile() (e.g. for the node_exporter textfile collector)
+or serve() for a local HTTP endpoint at /metrics.
+
+Created on Sun Oct 18 16:02:09 2026
+
+"""
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import arxframe
+
+buckets = (0.002,0.005,0.010,0.020,0.050,0.100,0.200,0.500,1.000,2.000)
+
+
+class arxmetrics():
+    """ class to accumulate transaction metrics, safe to share between buses and threads """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.transactions = {}      # (bus,cmd,addr,status) -> count
+        self.sent = {}              # (bus,cmd,addr) -> characters
+        self.received = {}
+        self.naks = {}              # (bus,cmd,addr,generic,reason) -> count
+        self.garbage = {}           # (bus,cmd,addr) -> characters
+        self.latency = {}           # (bus,cmd,addr) -> [bucket counts..., sum, count]
+        self.server = None
+
+    def record(self,bus,addr,string,sent,r,elapsed,expectreply=True):
+        """record one transaction of command string to addr on bus"""
+        cmd = string[:4]
+        key = (bus,cmd,str(addr))
+        if expectreply:
+            status,generic,reason,garbage = arxframe.classify(r)
+        else:
+            status,generic,reason,garbage = ('noreply','','',len(r))
+        with self.lock:
+            k = key+(status,)
+            self.transactions[k] = self.transactions.get(k,0)+1
+            self.sent[key] = self.sent.get(key,0)+sent
+            self.received[key] = self.received.get(key,0)+len(r)
+            if garbage:
+                self.garbage[key] = self.garbage.get(key,0)+garbage
+            if status == 'nak':
+                k = key+(generic,reason)
+                self.naks[k] = self.naks.get(k,0)+1
+            if status in ('ack','nak'):
+                h = self.latency.get(key)
+                if h is None:
+                    h = self.latency[key] = [0]*(len(buckets)+2)
+                for i,b in enumerate(buckets):
+                    if elapsed <= b:        # buckets are cumulative
+                        h[i] += 1
+                h[-2] += elapsed
+                h[-1] += 1
+
+    def render(self):
+        """all metrics in Prometheus text format"""
+        def labels(key,names=('bus','cmd','addr')):
+            return ",".join(['%s="%s"'%(n,str(v).replace('\\','\\\\').replace('"','\\"'))
+                             for n,v in zip(names,key)])
+        lines = []
+        with self.lock:
+            for name,help,table,names in (
+                    ('arx_transactions_total','Transactions by response status',
+                     self.transactions,('bus','cmd','addr','status')),
+                    ('arx_chars_sent_total','Characters sent',self.sent,None),
+                    ('arx_chars_received_total','Characters received',self.received,None),
+                    ('arx_naks_total','NAK responses by generic and reason code',
+                     self.naks,('bus','cmd','addr','generic','reason')),
+                    ('arx_garbage_chars_total','Characters outside the ACK or NAK frame',self.garbage,None)):
+                lines.append("# HELP %s %s"%(name,help))
+                lines.append("# TYPE %s counter"%name)
+                for key,v in sorted(table.items()):
+                    lines.append("%s{%s} %d"%(name,labels(key,names or ('bus','cmd','addr')),v))
+            name = 'arx_transaction_seconds'
+            lines.append("# HELP %s Time from command sent to response received"%name)
+            lines.append("# TYPE %s histogram"%name)
+            for key,h in sorted(self.latency.items()):
+                l = labels(key)
+                for i,b in enumerate(buckets):
+                    lines.append('%s_bucket{%s,le="%g"} %d'%(name,l,b,h[i]))
+                lines.append('%s_bucket{%s,le="+Inf"} %d'%(name,l,h[-1]))
+                lines.append('%s_sum{%s} %.6f'%(name,l,h[-2]))
+                lines.append('%s_count{%s} %d'%(name,l,h[-1]))
+        return "\n".join(lines)+"\n"
+
+    def writefile(self,filename):
+        """write the metrics to filename, replacing it atomically"""
+        tmp = filename+".tmp"
+        with open(tmp,'w') as f:
+            f.write(self.render())
+        os.replace(tmp,filename)
+
+    def serve(self,port=9108,host='127.0.0.1'):
+        """serve the metrics at http://host:port/metrics from a background thread"""
+        metrics = self
+        class handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type','text/plain; version=0.0.4')
+                self.send_header('Content-Length',str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            def log_message(self,format,*args):
+                pass
+        self.server = ThreadingHTTPServer((host,port),handler)
+        threading.Thread(target=self.server.serve_forever,name="arxmetrics",daemon=True).start()
+        return self.server
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Usage:
+  arxmultibus [--ini=<inifile>] [--cycles=<n>]
+
+Options:
+  -i --ini=<inifile>       File with BUS lines [default: arxini.txt]
+  -n --cycles=<n>          Number of sweeps [default: 1]
+
+arx multibus
+
+Drives several RS485 buses at once, one worker thread per bus.  Each bus is
+half-duplex, so transactions on one bus are strictly sequential, but the
+buses are independent and run in parallel.  Every board address belongs to
+exactly one bus; results from all buses are merged into one dict keyed by
+board address.
+
+Buses are listed in the ini file, one per line:
+    BUS <name> <port> <addr> [<addr> ...]
+
+Created on Sun Oct 18 10:41:55 2026
+
+"""
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import arx
+import arxcmds
+import arxsweep
+
+
+class arxmultibus():
+    """ class to manage several 485 buses, each with its own set of boards """
+
+    def __init__(self,dneu="analogChannelCodes-modLux.xls"):
+        self.dneu = dneu
+        self.handlers = {}      # bus name -> arxcmds.arxcmd
+        self.addrs = {}         # bus name -> list of board addresses
+        self.busof = {}         # board address -> bus name
+        self.workers = {}       # bus name -> single thread executor
+
+    def addbus(self,name,port,addrs):
+        """open a bus and assign boards to it.  Returns False on failure"""
+        for addr in addrs:
+            if addr in self.busof:
+                print("address %d already assigned to bus %s"%(addr,self.busof[addr]))
+                return(False)
+        bus = arx.arx485(name,port)
+        if not bus.serial:
+            return(False)
+        cmdhandler = arxcmds.arxcmd(dneu=self.dneu)
+        cmdhandler.setBus(bus)
+        self.handlers[name] = cmdhandler
+        self.addrs[name] = list(addrs)
+        for addr in addrs:
+            self.busof[addr] = name
+        self.workers[name] = ThreadPoolExecutor(max_workers=1,thread_name_prefix=name)
+        return(True)
+
+    def handler(self,addr):
+        """the arxcmd for the bus that board addr is on"""
+        return self.handlers[self.busof[addr]]
+
+    def _runbus(self,name,func,addrs):
+        cmdhandler = self.handlers[name]
+        results = {}
+        for addr in addrs:
+            cmdhandler.setAddr(addr)
+            results[addr] = func(cmdhandler,addr)
+        return results
+
+    def run(self,func,addrs=None):
+        """run func(cmdhandler,addr) for each board, all buses in parallel.
+        addrs defaults to every board on every bus.
+        Returns dict of address -> return value of func.
+        """
+        if addrs is None:
+            addrs = self.busof.keys()
+        perbus = {}
+        for addr in addrs:
+            perbus.setdefault(self.busof[addr],[]).append(addr)
+        futures = [self.workers[name].submit(self._runbus,name,func,busaddrs)
+                   for name,busaddrs in perbus.items()]
+        results = {}
+        for f in futures:
+            results.update(f.result())
+        return results
+
+    def command(self,method,*args,addrs=None):
+        """call arxcmd method by name with args on each board"""
+        return self.run(lambda cmdhandler,addr: getattr(cmdhandler,method)(*args),addrs)
+
+    def makesweeps(self,period=1.0,owteperiod=None):
+        """make an arxsweep.arxsweep for each bus, to be driven by cycle()"""
+        self.sweeps = {name: arxsweep.arxsweep(self.handlers[name],self.addrs[name],
+                                              period=period,owteperiod=owteperiod)
+                       for name in self.handlers}
+
+    def cycle(self):
+        """one monitor sweep of all buses in parallel.  Returns dict of address -> results"""
+        if not hasattr(self,'sweeps'):
+            self.makesweeps()
+        futures = [self.workers[name].submit(s.cycle) for name,s in self.sweeps.items()]
+        results = {}
+        for f in futures:
+            results.update(f.result())
+        return results
+
+    def close(self):
+        for w in self.workers.values():
+            w.shutdown()
+        for cmdhandler in self.handlers.values():
+            cmdhandler.bus.serial.close()
+
+
+def loadini(filename,multibus):
+    """add the buses given by BUS lines in an ini file.  Returns number added"""
+    n = 0
+    with open(filename) as f:
+        for line in f:
+            ss = line.split()
+            if len(ss)>2 and ss[0].upper() == "BUS":
+                if multibus.addbus(ss[1],ss[2],[int(a,0) for a in ss[3:]]):
+                    n += 1
+    return n
+
+
+if __name__ == "__main__":
+    import docopt
+
+    opts = docopt.docopt(__doc__)
+    multibus = arxmultibus()
+    if loadini(opts['--ini'],multibus) == 0:
+        print("no buses opened")
+        sys.exit(1)
+    for i in range(int(opts['--cycles'])):
+        tstart = time.monotonic()
+        results = multibus.cycle()
+        print("sweep %d: %d boards on %d buses in %.3f s"%(
+                i,len(results),len(multibus.handlers),time.monotonic()-tstart))
+    multibus.close()
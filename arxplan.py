@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Usage:
+  arxplan [--port=<serialPort>] [--broadcast] [--confirm] [--dry-run] <targetfile>
+
+Options:
+  -p --port=<serialPort>   Serial port of the RS485 interface
+  -b --broadcast           The target file lists every board on the bus, so
+                           broadcast SETS may be used
+  -c --confirm             After a broadcast, ask every target board with
+                           LAST whether it was received
+  -n --dry-run             Print the plan, send nothing
+
+arx plan
+
+Plan and apply a configuration for many boards with the fewest commands.
+
+A broadcast SETS (address 0) configures every channel of every board on
+the bus in one command, so when many boards are to be set to the same
+uniform value, the plan starts with a broadcast and then fixes up the
+boards that differ.  Otherwise each board gets SETS if it is uniform, or
+SETA/SETC as chosen by arxcmds.planboard(), and boards whose shadow already
+matches are skipped.  Broadcasts reach boards that are not in the target
+too, so they are only used when the caller says the target covers the
+whole bus.  A broadcast gets no reply; with --confirm each target board is
+then asked with LAST whether it received it, and a board that did not is
+sent the command on its own.  After the plan is sent, a GETA readback of every board checks
+the result.
+
+The target file has one line per board, '#' starts a comment:
+    <addr> <config>                 all 16 channels the same
+    <addr> <config0> ... <config15>
+
+Created on Sun Oct 18 13:15:22 2026
+
+"""
+import sys
+from collections import Counter
+
+import arxcmds
+
+
+def plan(target,shadows=None,broadcast=False):
+    """plan - commands to bring a set of boards to a target configuration
+    target is a dict of address -> list of 16 configuration numbers.
+    shadows is a dict of address -> list of 16 known configurations (None if
+    unknown), normally arxcmd.shadow.
+    broadcast allows broadcast SETS; only use it if target has every board on the bus.
+    Returns a list of (addr,method,args) for arxcmd.
+    """
+    if shadows is None:
+        shadows = {}
+    perboard = {}
+    for addr,configs in target.items():
+        perboard[addr] = arxcmds.planboard(configs,shadows.get(addr,[None]*16))
+    steps = [(addr,method,args) for addr in target for method,args in perboard[addr]]
+    if not broadcast:
+        return steps
+    if any([None in configs for configs in target.values()]):
+        return steps            # a broadcast would change channels meant to be left alone
+
+    uniform = Counter([configs[0] for configs in target.values()
+                       if None not in configs and len(set(configs)) == 1])
+    if len(uniform) == 0:
+        return steps
+    v,n = uniform.most_common(1)[0]
+    bsteps = [(0,'sets',(v,))]
+    for addr,configs in target.items():
+        bsteps += [(addr,method,args) for method,args in arxcmds.planboard(configs,[v]*16)]
+    if len(bsteps) < len(steps):
+        return bsteps
+    return steps
+
+def apply(cmdhandler,steps,confirm=None):
+    """send the commands of a plan.  Returns True if all succeeded.
+    Broadcasts get no reply, so they are not counted as failures.  confirm
+    is an optional list of addresses checked with LAST after each broadcast;
+    those that missed it are sent the same command individually.
+    """
+    tf = True
+    for addr,method,args in steps:
+        if addr == 0:
+            res,received = cmdhandler.broadcast(method,*args,confirm=confirm)
+            for a,ok in received.items():
+                if not ok:
+                    cmdhandler.setAddr(a)
+                    tf = bool(getattr(cmdhandler,method)(*args)) and tf
+            continue
+        cmdhandler.setAddr(addr)
+        tf = bool(getattr(cmdhandler,method)(*args)) and tf
+    return(tf)
+
+def verify(cmdhandler,target):
+    """read back every board with GETA.
+    Returns dict of address -> list of channels that do not match the target;
+    boards that match are omitted.  A board that does not reply has all its
+    targeted channels listed.
+    """
+    bad = {}
+    for addr,configs in target.items():
+        cmdhandler.setAddr(addr)
+        res = cmdhandler.geta()
+        actual = res.value if res else []
+        wrong = [i for i,c in enumerate(configs)
+                 if c is not None and (len(actual) != 16 or actual[i] != c)]
+        if wrong:
+            bad[addr] = wrong
+    return bad
+
+def loadtarget(filename):
+    """read a target file, see module documentation"""
+    target = {}
+    with open(filename) as f:
+        for line in f:
+            idx = line.find('#')
+            if idx > -1:
+                line = line[:idx]
+            ss = line.split()
+            if len(ss) == 0:
+                continue
+            addr = int(ss[0],0)
+            if len(ss) == 2:
+                target[addr] = [int(ss[1],0)]*16
+            elif len(ss) == 17:
+                target[addr] = [int(v,0) for v in ss[1:]]
+            else:
+                print("expected 1 or 16 configurations for address %d"%addr)
+    return target
+
+
+if __name__ == "__main__":
+    import docopt
+    import arx
+
+    opts = docopt.docopt(__doc__)
+    target = loadtarget(opts['<targetfile>'])
+    steps = plan(target,broadcast=opts['--broadcast'])
+    for addr,method,args in steps:
+        print("%3d %s %s"%(addr,method.upper(),args))
+    print("%d commands for %d boards"%(len(steps),len(target)))
+    if opts['--dry-run']:
+        sys.exit(0)
+
+    commname = opts['--port'] or "/dev/ttyUSB0"
+    bus = arx.arx485('bus',commname)
+    if not bus.serial:
+        print("unable to open 485 interface at",commname)
+        sys.exit(1)
+    cmdhandler = arxcmds.arxcmd()
+    cmdhandler.setBus(bus)
+    cmdhandler.setHumanOutput(None)
+    apply(cmdhandler,steps,list(target) if opts['--confirm'] else None)
+    bad = verify(cmdhandler,target)
+    for addr,channels in bad.items():
+        print("address %d: channels %s not as planned"%(addr,channels))
+    print("verified %d of %d boards"%(len(target)-len(bad),len(target)))
+    sys.exit(1 if bad else 0)
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+arx registry
+
+The ARX commands as described in arxCommandDictionary.txt, read from its
+COMMAND DESCRIPTIONS section when this module is imported, so that the
+dictionary stays the one place the protocol is written down.
+
+For each command code, an arxcommand gives
+    args         argument format from the syntax line, e.g. 'nvvvv', '[aa][bbbb]'
+    fields       the argument as (width in hex digits, optional) fields
+    maxtext      longest free-text argument, e.g. 74 for ECHO; None if the
+                 argument is not free text or the dictionary gives no limit
+    reply        reply format from the response line, e.g. 'vvvv....vvvv'
+    replychars   characters between <ACK> and <CR>; None if it varies
+    deadline     seconds allowed for the response (100 ms, or as the
+                 description says, e.g. 'up to 1000 ms')
+    noreply      True if the command never gets a response (RSET)
+    broadcast    True if the command may usefully be broadcast: it returns
+                 no data and the dictionary does not say otherwise
+A command that is not in the dictionary gets the generic treatment: read
+up to 80 characters, allow 1 s.
+
+Run as a script to print the table.
+
+Created on Sun Oct 18 19:02:44 2026
+
+"""
+import os
+import re
+
+MAXRESPONSE = 80        # characters, including <ACK> and <CR>
+responsetime = 0.100    # seconds, unless the description gives longer
+unknowntime = 1.000     # seconds, for a command not in the dictionary
+
+dictionaryfile = os.path.join(os.path.dirname(os.path.abspath(__file__)),"arxCommandDictionary.txt")
+
+
+class arxcommand():
+    """ one command of the Command Dictionary """
+    __slots__ = ('code','description','args','fields','repeat','text',
+                 'maxtext','reply','replychars','deadline','noreply','broadcast')
+
+    def __init__(self,code,description=""):
+        self.code = code
+        self.description = description
+        self.args = ""
+        self.fields = []        # (width,optional)
+        self.repeat = False     # fields are one repeated value, e.g. SETA
+        self.text = False       # argument is free text, e.g. ECHO
+        self.maxtext = None     # characters allowed in the free text
+        self.reply = ""
+        self.replychars = None
+        self.deadline = unknowntime
+        self.noreply = False
+        self.broadcast = False
+
+    def datachars(self,args=""):
+        """characters between <ACK> and <CR> of the reply to this command with
+        argument string args; None if it varies or there is no reply.
+        """
+        if self.noreply or self.replychars is None:
+            return None
+        n = self.replychars
+        if '<anystring>' in self.reply:
+            n += len(args)
+        return n
+
+    def responsechars(self,args=""):
+        """characters in the whole acknowledged response, <ACK> to <CR>, to
+        this command with argument string args; 0 if there is none,
+        MAXRESPONSE if not known.  For timing only: a response is read to
+        its CR, since a NAK (<NAK><e><f><CR>) may be longer than the reply.
+        """
+        if self.noreply:
+            return 0
+        n = self.datachars(args)
+        if n is None:
+            return MAXRESPONSE
+        return min(n+2,MAXRESPONSE)
+
+    def __repr__(self):
+        return "arxcommand(%s args=%r reply=%r chars=%s deadline=%.3f%s%s)"%(
+                self.code,self.args,self.reply,self.replychars,self.deadline,
+                " noreply" if self.noreply else ""," broadcast" if self.broadcast else "")
+
+
+def fieldsof(fmt):
+    """split an argument format into (width,optional) fields: runs of one letter"""
+    fields = []
+    for m in re.finditer(r'(\[?)(([a-z])\3*)',fmt):
+        fields.append((len(m.group(2)),m.group(1) == '['))
+    return fields
+
+def lengthof(fmt,text):
+    """characters in a reply or argument of format fmt, None if it varies.
+    A repeated format such as 'vvvv....vvvv' or 'nntt...t' takes its length
+    from the description ('64 characters long', 'string of 16 hex digits').
+    """
+    fmt = fmt.replace('<a>','')         # TEMP response is written <ACK><a>vvvv
+    m = re.match(r'^([a-z]*?)([a-z])\2*\.{3,}\2+$',fmt)
+    if m:
+        n = re.search(r'(\d+) characters',text)
+        if n:
+            return int(n.group(1))
+        n = re.search(r'string of (\d+) hex digits',text)
+        if n:
+            return len(m.group(1))+int(n.group(1))
+        return None
+    if '<anystring>' in fmt:
+        return len(fmt.replace('<anystring>',''))
+    if re.match(r'^[a-zA-Z]*$',fmt):
+        return len(fmt)
+    return None
+
+def parseblock(lines):
+    """the arxcommands described in one block of the dictionary"""
+    text = " ".join([line.strip() for line in lines])
+    entries = {}
+    syntax = []
+    replies = []
+    header = True
+    for line in lines:
+        if line.startswith('syntax:'):
+            header = False
+        m = re.match(r'^([A-Z0-9]{4})\s+(\S.*)$',line)
+        if m and header:
+            entries[m.group(1)] = arxcommand(m.group(1),m.group(2).strip())
+            continue
+        m = re.match(r'^<a>([A-Z0-9]{4})(.*?)<CR>',line)
+        if m:
+            syntax.append((m.group(1),m.group(2)))
+            continue
+        if line.startswith('<ACK>'):     # <ACK>reply<CR>, sometimes written CR>
+            reply = re.match(r'^<ACK>(.*?)<?CR>',line)
+            code = re.search(r'\((\w{4})\)\s*$',line)
+            replies.append((code.group(1) if code else None,reply.group(1) if reply else ""))
+    if not entries:
+        return {}
+    deadline = responsetime
+    m = re.findall(r'(?:up to|~)\s*(\d+) ms',text)
+    if m:
+        deadline = max([int(v) for v in m])/1000.0
+    for code,e in entries.items():
+        # with one command per block its syntax line is used whatever code it
+        # shows, since the SETS and SETA syntax lines have each other's codes
+        for scode,args in syntax:
+            if scode == code or len(entries) == 1:
+                e.args = args
+                break
+        if e.args == '<anystring>':
+            e.text = True
+            n = re.search(r'up to (\d+) printable',text)
+            if n:
+                e.maxtext = int(n.group(1))
+        elif '...' in e.args:
+            n = lengthof(e.args,text.replace('argument string is','')) or 0
+            width = len(re.match(r'^([a-z])\1*',e.args).group(0))
+            e.fields = [(width,False)]*(n//width)
+            e.repeat = True
+        else:
+            e.fields = fieldsof(e.args)
+        for rcode,reply in replies:
+            if rcode is None or rcode == code:
+                e.reply = reply
+                e.replychars = lengthof(reply,text)
+                break
+        e.noreply = 'does not return any response' in text
+        e.deadline = 0.0 if e.noreply else deadline
+        e.broadcast = (e.noreply or e.replychars == 0) and 'should not be broadcast' not in text
+    return entries
+
+def load(filename=dictionaryfile):
+    """read the command descriptions of the dictionary.  Returns dict of code -> arxcommand"""
+    commands = {}
+    with open(filename) as f:
+        lines = f.read().splitlines()
+    try:
+        start = lines.index('COMMAND DESCRIPTIONS')
+    except ValueError:
+        return commands
+    block = []
+    for line in lines[start+1:]+['-'*10]:
+        if re.match(r'^-{10,}\s*$',line):
+            commands.update(parseblock(block))
+            block = []
+        else:
+            block.append(line)
+    return commands
+
+try:
+    commands = load()
+except OSError:
+    print("Command Dictionary not found: %s"%dictionaryfile)
+    commands = {}
+
+unknown = arxcommand('????')
+unknown.replychars = None
+
+
+def lookup(string):
+    """the arxcommand for a command string (code and arguments); unknown codes
+    give a generic entry with an 80 character reply and a 1 s deadline.
+    """
+    return commands.get(string[:4].upper(),unknown)
+
+def responsechars(string):
+    """characters expected in the acknowledged response to command string"""
+    return lookup(string).responsechars(string[4:])
+
+def datachars(string):
+    """characters expected between <ACK> and <CR> of the reply to command
+    string, None if it varies"""
+    return lookup(string).datachars(string[4:])
+
+def maxtext(code):
+    """characters allowed in the free-text argument of command code, None if
+    not limited"""
+    return lookup(code).maxtext
+
+
+if __name__ == "__main__":
+    for code,e in sorted(commands.items()):
+        print("%s %-14s %-20s %5s %4d %6.3f %s"%(code,e.args,e.reply,e.replychars,
+                e.responsechars(),e.deadline,
+                "noreply" if e.noreply else ("broadcast" if e.broadcast else "")))
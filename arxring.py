@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+arx ring
+
+Fixed-size, memory-mapped ring buffer of monitor frames.  Each frame holds
+one board's readings from one sweep:
+    t       time of the first reading (Unix seconds)
+    addr    board address
+    powa    16 channel POWA values (ADC counts)
+    cura    16 channel CURA values (ADC counts)
+    curb    CURB value
+    temp    TEMP value
+Values that were not read in a sweep are 0xFFFF.
+
+The writer is an arxcmds.arxcmd given the ring with setRing(); its monitor
+methods stage values for the current board, and commit() writes the frame.
+arxsweep commits each board after reading it.
+
+Readers get NumPy views directly on the mapped memory, so nothing is copied
+and nothing is sent on the bus.  With a file name, other processes can open
+the same ring read-only.  The newest frame may be partly written while it
+is being read; the frame count is advanced only after a frame is complete.
+
+Created on Sun Oct 18 12:05:48 2026
+
+"""
+import mmap
+import os
+import time
+
+import numpy as np
+
+MAGIC = b"ARXRING1"
+HEADERSIZE = 64             # magic, nframes, count, then spare
+
+framedtype = np.dtype([
+    ('t','<f8'),
+    ('addr','<u2'),
+    ('powa','<u2',(16,)),
+    ('cura','<u2',(16,)),
+    ('curb','<u2'),
+    ('temp','<u2'),
+    ])
+fields = ('powa','cura','curb','temp')
+
+
+class arxring():
+    """ class for a ring buffer of monitor frames, optionally backed by a file
+
+    nframes is the capacity; for 44 boards at a 1 s sweep, 10 minutes is
+    44*600 = 26400 frames, about 1.9 MB.
+    """
+    def __init__(self,filename=None,nframes=26400,readonly=False):
+        size = HEADERSIZE + nframes*framedtype.itemsize
+        self.file = None
+        if filename is None:
+            self.mm = mmap.mmap(-1,size)
+            new = True
+        elif readonly:
+            self.file = open(filename,'rb')
+            self.mm = mmap.mmap(self.file.fileno(),0,access=mmap.ACCESS_READ)
+            new = False
+        else:
+            new = not os.path.exists(filename) or os.path.getsize(filename) != size
+            self.file = open(filename,'w+b' if new else 'r+b')
+            if new:
+                self.file.truncate(size)
+            self.mm = mmap.mmap(self.file.fileno(),size)
+        self.header = np.ndarray((2,),dtype='<u8',buffer=self.mm,offset=len(MAGIC))
+        if new:
+            self.mm[:len(MAGIC)] = MAGIC
+            self.header[0] = nframes
+            self.header[1] = 0
+        elif self.mm[:len(MAGIC)] != MAGIC:
+            raise ValueError("not an arx ring file: %s"%filename)
+        self.nframes = int(self.header[0])
+        self.frames = np.ndarray((self.nframes,),dtype=framedtype,buffer=self.mm,offset=HEADERSIZE)
+        self.pending = {}
+
+    @property
+    def count(self):
+        """total number of frames ever written"""
+        return int(self.header[1])
+
+    def stage(self,addr,field,values):
+        """hold a reading for board addr until commit()"""
+        frame = self.pending.get(addr)
+        if frame is None:
+            frame = np.zeros((),dtype=framedtype)
+            for f in fields:
+                frame[f] = 0xFFFF
+            frame['t'] = time.time()
+            frame['addr'] = addr
+            self.pending[addr] = frame
+        if len(values):
+            frame[field] = values if framedtype[field].shape else values[0]
+
+    def commit(self,addr):
+        """write the staged frame for board addr to the ring"""
+        frame = self.pending.pop(addr,None)
+        if frame is None:
+            return
+        count = self.count
+        self.frames[count%self.nframes] = frame
+        self.header[1] = count+1
+
+    def last(self,n):
+        """views of the last n frames in time order, as a list of one or two arrays"""
+        count = self.count
+        n = min(n,count,self.nframes)
+        end = count%self.nframes
+        if n <= end:
+            return [self.frames[end-n:end]]
+        return [self.frames[self.nframes-(n-end):],self.frames[:end]]
+
+    def since(self,seconds):
+        """views of the frames from the last seconds, as for last()"""
+        tmin = time.time()-seconds
+        views = self.last(self.nframes)
+        out = []
+        for v in views:
+            i = np.searchsorted(v['t'],tmin)
+            if i < len(v):
+                out.append(v[i:])
+        return out
+
+    def close(self):
+        del self.header,self.frames
+        self.mm.close()
+        if self.file:
+            self.file.close()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Usage:
+  arxscan [--port=<serialPort>] [--baud=<baud>] [--first=<ms>] [--cache=<file>] [<addr>...]
+
+Options:
+  -p --port=<serialPort>   Serial port of the RS485 interface
+  -b --baud=<baud>         Baud rate of the boards [default: 19200]
+  -f --first=<ms>          Time allowed for the first character of a reply [default: 20]
+  -c --cache=<file>        Metadata cache to bring up to date (see arxmeta.py)
+
+arx scan
+
+Find the boards on a bus and build an inventory from their ARXN replies:
+address, serial number, software version, input coupling of each channel
+and the channel of each temperature sensor.  Without addresses, every
+board address is tried, 1 to 126 (0x80 is broadcast, 0xFF reserved).
+
+At an address with no board, nothing ever arrives, so instead of the
+100 ms the dictionary allows for the whole response, only --first ms is
+allowed for its first character; a board that starts to answer gets the
+rest of the 100 ms.  A full scan then takes about 126 times (the command's
+wire time + first), a few seconds.  A board that is slower to start than
+the --first time is missed, so raise it for a slow USB adapter.  The
+boards found whose ARXN differs from the metadata cache are read again
+if --cache is given.
+
+Created on Sun Oct 18 21:24:18 2026
+
+"""
+import sys
+import time
+
+import arxcmds
+import arxframe
+
+firsttime = 0.020       # seconds allowed for the first character of a reply
+alladdrs = range(1,127)
+
+
+def probe(cmdhandler,addr,first=firsttime):
+    """ARXN to addr, giving up if no character arrives within first seconds
+    of the command being sent.  Returns the arxresult, value a boardinfo.
+    """
+    bus = cmdhandler.bus
+    string = 'ARXN'
+    t = time.monotonic()
+    bus.clear_buffers()
+    bus.send(addr,string)
+    first += arxframe.wiretime(len(string)+2,bus.serial.baudrate)
+    r = bus.receive(arxframe.MAXRESPONSE,first=first)
+    res = arxcmds.makeresult(addr,string,r,time.monotonic()-t)
+    if res:
+        arxcmds.decodearxn(res)
+    return res
+
+def scan(cmdhandler,addrs=alladdrs,first=firsttime):
+    """scan - probe each address of addrs with ARXN.
+    Returns the inventory, a dict of address -> arxcmds.boardinfo, for every
+    address that answered; the value is None if its reply was not valid.
+    """
+    inventory = {}
+    for addr in addrs:
+        res = probe(cmdhandler,addr,first)
+        if res.status == 'timeout':
+            continue
+        if not res:
+            cmdhandler.debugprint("address %d: %s %s"%(addr,res.status,res.value))
+        inventory[addr] = res.value if res else None
+    return inventory
+
+def show(inventory,file=sys.stdout):
+    """print the inventory as a table"""
+    if file is None:
+        return
+    print("addr serial version fiber K sensor channels",file=file)
+    for addr,info in sorted(inventory.items()):
+        if info is None:
+            print("%4d  (invalid ARXN reply)"%addr,file=file)
+            continue
+        print("%4d %6d    %04X  %04X %d %s"%(addr,info.serial,info.version,info.fiber,
+                info.nsensors," ".join(["%d"%(t+1) for t in info.sensormap])),file=file)
+    print("%d boards"%len(inventory),file=file)
+
+
+if __name__ == "__main__":
+    import docopt
+    import arx
+
+    opts = docopt.docopt(__doc__)
+    commname = opts['--port'] or "/dev/ttyUSB0"
+    bus = arx.arx485('bus',commname,baudrate=int(opts['--baud']))
+    if not bus.serial:
+        print("unable to open 485 interface at",commname)
+        sys.exit(1)
+    cmdhandler = arxcmds.arxcmd(dneu=None)
+    cmdhandler.setBus(bus)
+    addrs = [int(a,0) for a in opts['<addr>']] or alladdrs
+    t = time.monotonic()
+    inventory = scan(cmdhandler,addrs,float(opts['--first'])/1000.0)
+    show(inventory)
+    if opts['--cache']:
+        import arxmeta
+        meta = arxmeta.arxmeta(opts['--cache'])
+        stale = [addr for addr,info in inventory.items()
+                 if info is not None and not meta.matches(addr,info)]
+        for addr in stale:
+            meta.check(cmdhandler,addr,inventory[addr])
+        if stale:
+            meta.save()
+        print("%d boards read again for %s"%(len(stale),opts['--cache']))
+    print("scanned %d addresses in %.2f s"%(len(addrs),time.monotonic()-t))
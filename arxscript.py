@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+arx script
+
+Batch execution of command scripts, for the --input option of arx.py and
+arxcomm.py.
+
+A script has the same lines as are typed at the interactive prompt:
+    # comment                 anything after # is ignored
+    CMD args                  sent to the default address
+    21 CMD args               sent to address 21
+    21                        sets the default address
+    * CMD args                broadcast
+    !WAITSEC n                pause n seconds (0-60, default 1)
+    !X or !!                  end of script
+The whole script is compiled before anything is sent, so a mistake on
+line 900 is reported without running lines 1-899.  The commands are then
+sent back to back, without echo or per-line output, and each result is
+written as a row of a CSV log:
+    time,line,addr,command,status,elapsed_ms,value,reply
+
+Created on Sun Oct 18 18:21:50 2026
+
+"""
+import csv
+import time
+
+import arxcmds
+import arxformat
+import arxregistry
+
+logcolumns = ('time','line','addr','command','status','elapsed_ms','value','reply')
+
+
+def rawcmd(ss):
+    """compile a command for arxcmd.command, sent as typed (first word only, as arxcomm)"""
+    return ('command',(ss[0],))
+
+def compilescript(lines,compilecmd=rawcmd,defaultaddr=2,sticky=True):
+    """compilescript - compile the lines of a script into steps.
+    compilecmd(words) returns (arxcmd method,args) or None if invalid, e.g.
+    arx.compilecmd.  sticky makes an address prefix also set the default
+    address, as arx.py does; otherwise only an address on a line by itself does.
+    Returns (steps,errors).  Each step is (line,addr,method,args,text); a
+    pause is method 'wait' with args (seconds,).  errors is a list of
+    (line,message).
+    """
+    steps = []
+    errors = []
+    for lineno,line in enumerate(lines,1):
+        s = line.upper()
+        idx = s.find("#")
+        if idx > -1:
+            s = s[:idx]
+        s = s.strip()
+        if len(s) == 0:
+            continue
+        if s in ['!X', "!!"]:
+            break
+        ss = s.split()
+        if ss[0] == "!WAITSEC":
+            nsec = 1.0
+            if len(ss) > 1:
+                try:
+                    nsec = float(ss[1])
+                except ValueError:
+                    errors.append((lineno,"invalid delay %s"%ss[1]))
+                    continue
+            if nsec < 0 or nsec > 60:
+                errors.append((lineno,"delay %s not 0-60 seconds"%ss[1]))
+                continue
+            steps.append((lineno,None,'wait',(nsec,),s))
+            continue
+        addr = defaultaddr
+        if ss[0][0] in '1234567890':
+            try:
+                addr = int(ss[0],0)
+            except ValueError:
+                errors.append((lineno,"not a valid number: %s"%ss[0]))
+                continue
+            if addr < 0 or addr > 128:
+                errors.append((lineno,"not a valid address (1-127): %d"%addr))
+                continue
+            if addr == 128:
+                addr = 0
+            ss = ss[1:]
+            if sticky or len(ss) == 0:
+                defaultaddr = addr
+        if len(ss) and ss[0][0] == "*":
+            addr = 0
+            ss = ss[1:]
+        if len(ss) == 0:
+            continue
+        if addr == 0 and ss[0] in arxregistry.commands and not arxregistry.commands[ss[0]].broadcast:
+            errors.append((lineno,"%s must not be broadcast"%ss[0]))
+            continue
+        step = compilecmd(ss)
+        if step is None:
+            errors.append((lineno,"invalid command: %s"%s))
+            continue
+        steps.append((lineno,addr,step[0],step[1],s))
+    return steps,errors
+
+def logrow(lineno,res):
+    """one CSV row for arxresult res"""
+    value = res.value
+    if value is None:
+        value = ""
+    elif isinstance(value,arxcmds.boardinfo):
+        value = "; ".join(arxformat.arxntext(value))
+    elif not isinstance(value,(str,int)):
+        value = " ".join([str(int(v)) for v in value])
+    reply = res.raw[1:].rstrip(b'\r').decode('ascii','replace')
+    return ("%.6f"%time.time(),lineno,res.addr,res.cmd,res.status,
+            "%.2f"%(res.elapsed*1000),value,reply)
+
+def runscript(cmdhandler,steps,logfile=None):
+    """runscript - send compiled steps with cmdhandler, an arxcmds.arxcmd.
+    Results go to logfile as CSV, or if it is None, as text to the
+    handler's human output.  Returns the number of commands that failed
+    (broadcasts and RSET, which have no reply, are not failures).
+    """
+    writer = None
+    if logfile:
+        writer = csv.writer(logfile)
+        writer.writerow(logcolumns)
+    failed = 0
+    for lineno,addr,method,args,text in steps:
+        if method == 'wait':
+            time.sleep(args[0])
+            continue
+        cmdhandler.setAddr(addr)
+        res = getattr(cmdhandler,method)(*args)
+        if res.status not in ('ack','noreply'):
+            failed += 1
+        if writer:
+            writer.writerow(logrow(lineno,res))
+        else:
+            arxformat.show(res,cmdhandler.t,cmdhandler.human)
+    return failed
+
+def runfile(cmdhandler,infile,logfilename=None,compilecmd=rawcmd,defaultaddr=2,sticky=True):
+    """compile and run script file infile, logging to logfilename.
+    Returns True if the script compiled and every command succeeded.
+    """
+    with open(infile) as f:
+        steps,errors = compilescript(f,compilecmd,defaultaddr,sticky)
+    for lineno,message in errors:
+        print("%s line %d: %s"%(infile,lineno,message))
+    if errors:
+        print("%d errors, nothing sent"%len(errors))
+        return False
+    ncmds = len([step for step in steps if step[2] != 'wait'])
+    t = time.monotonic()
+    if logfilename:
+        with open(logfilename,'w',newline='') as logfile:
+            failed = runscript(cmdhandler,steps,logfile)
+    else:
+        failed = runscript(cmdhandler,steps)
+    print("%d commands, %d failed, %.3f s"%(ncmds,failed,time.monotonic()-t))
+    return failed == 0
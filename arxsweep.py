@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Usage:
+  arxsweep [--port=<serialPort>] [--baud=<baud>] [--period=<sec>] [--owte=<sec>] [--cycles=<n>] [--sleep] [--metrics=<port>] [--archive=<dir>] <addr>...
+
+Options:
+  -p --port=<serialPort>   Serial port of the RS485 interface
+  -b --baud=<baud>         Baud rate of the boards (see arxbaud) [default: 19200]
+  -t --period=<sec>        Target sweep period, seconds [default: 1.0]
+  -o --owte=<sec>          Period for OWTE channel temperatures, 0 for none [default: 0]
+  -n --cycles=<n>          Number of sweeps, 0 to run until interrupted [default: 0]
+  -s --sleep               Broadcast SLEP after each sweep, so boards sleep between sweeps
+  -m --metrics=<port>      Serve transaction metrics at http://localhost:<port>/metrics
+  -a --archive=<dir>       Archive every sweep under dir (see arxarchive.py)
+
+arx sweep
+
+Periodic monitor sweep of a set of ARX boards.  Every board is sent POWA,
+CURA, CURB and TEMP once per cycle.  OWTE takes up to 1000 ms per board, so
+it is spread over several cycles: each cycle reads OWTE from only as many
+boards as needed to cover all of them once per OWTE period.
+
+The cycle budget is the wire time of each command and its response at the
+current baud rate, plus the 100 ms the Command Dictionary allows each board
+to respond.  A cycle that takes longer than the target period is an overrun;
+overruns are counted and reported on the command handler's error output.
+
+A board that times out repeatedly is quarantined by an arxbreaker.arxbreaker:
+it is left out of the sweep, and of the results passed to the callback,
+until it answers the ECHO probe sent to one due board per cycle (see
+arxbreaker.py); sweep.breaker.quarantined() lists them.
+
+With sleep, every board is put to sleep with a broadcast SLEP at the end
+of each cycle, cutting power and RF noise between sweeps; the bus then
+sends the wake-up character and waits 10 ms before the next cycle, which
+is added to the budget.
+
+Created on Sun Oct 18 10:02:13 2026
+
+"""
+import math
+import time
+import sys
+
+import arxbreaker
+import arxframe
+import arxregistry
+
+commandchars = 6                # <a><code><CR>
+fastcmds = ('POWA','CURA','CURB','TEMP')
+replychars = {cmd:arxregistry.responsechars(cmd) for cmd in fastcmds}
+replychars['OWTE'] = 66         # varies with the number of sensors, up to 16
+
+
+class arxsweep():
+    """ class to sweep the monitor points of a list of boards at a fixed cadence
+
+    cmdhandler is an arxcmds.arxcmd already connected to the bus.
+    callback, if given, is called with the results of each cycle:
+    a dict of address -> dict of command -> arxcmds.arxresult.
+    breaker is an arxbreaker.arxbreaker, by default a new one.
+    """
+    def __init__(self,cmdhandler,addrs,period=1.0,owteperiod=None,callback=None,sleep=False,
+                 breaker=None):
+        self.cmdhandler = cmdhandler
+        self.addrs = list(addrs)
+        self.period = period
+        self.owteperiod = owteperiod
+        self.callback = callback
+        self.sleep = sleep
+        if breaker is None:
+            breaker = arxbreaker.arxbreaker(errorfile=cmdhandler.errorfile)
+        self.breaker = breaker
+        self.owtenext = 0           # index into addrs of next board for OWTE
+        self.cycles = 0
+        self.overruns = 0
+        self.lastcycle = 0.0
+        self.worstcycle = 0.0
+
+    def owtepercycle(self):
+        """number of boards read with OWTE in each cycle"""
+        if not self.owteperiod or not self.addrs:
+            return 0
+        n = math.ceil(len(self.addrs)*self.period/self.owteperiod)
+        return min(n,len(self.addrs))
+
+    def transactiontime(self,cmd):
+        """worst case time for one transaction at the bus's current baud rate"""
+        baud = self.cmdhandler.bus.serial.baudrate
+        wire = arxframe.wiretime(commandchars+replychars[cmd],baud)
+        return wire + arxframe.longresponsetime.get(cmd,arxframe.responsetime)
+
+    def budget(self):
+        """budgeted time for one cycle, seconds"""
+        t = len(self.addrs)*sum([self.transactiontime(cmd) for cmd in fastcmds])
+        t += self.owtepercycle()*self.transactiontime('OWTE')
+        if self.sleep:
+            baud = self.cmdhandler.bus.serial.baudrate
+            t += arxframe.wiretime(commandchars,baud) + arxframe.broadcastpause
+            t += arxframe.wiretime(len(arxframe.WAKEUP),baud) + arxframe.wakeuptime
+        return t
+
+    def cycle(self):
+        """sweep every board once.  Returns dict of address -> results"""
+        results = {}
+        cmdhandler = self.cmdhandler
+        breaker = self.breaker
+        for addr in self.addrs:
+            if not breaker.allowed(addr):
+                continue
+            cmdhandler.setAddr(addr)
+            results[addr] = {}
+            for cmd in fastcmds:
+                res = getattr(cmdhandler,cmd.lower())()
+                results[addr][cmd] = res
+                if not breaker.record(res):
+                    break
+            if cmdhandler.ring:
+                cmdhandler.ring.commit(addr)
+        for i in range(self.owtepercycle()):
+            addr = self.addrs[self.owtenext]
+            self.owtenext = (self.owtenext+1)%len(self.addrs)
+            if addr not in results or not breaker.allowed(addr):
+                continue
+            cmdhandler.setAddr(addr)
+            results[addr]['OWTE'] = res = cmdhandler.owte()
+            breaker.record(res)
+        for addr in breaker.due()[:1]:      # one probe per cycle
+            breaker.probe(cmdhandler,addr)
+        return results
+
+    def run(self,ncycles=None):
+        """sweep repeatedly at the target period, forever if ncycles is None"""
+        budget = self.budget()
+        if budget > self.period:
+            self.cmdhandler.debugprint("sweep budget %.3f s exceeds period %.3f s"%(budget,self.period))
+        tnext = time.monotonic()
+        while ncycles is None or self.cycles < ncycles:
+            tstart = time.monotonic()
+            results = self.cycle()
+            if self.sleep:
+                self.cmdhandler.broadcast('slep')
+            elapsed = time.monotonic() - tstart
+            self.cycles += 1
+            self.lastcycle = elapsed
+            self.worstcycle = max(self.worstcycle,elapsed)
+            if self.callback:
+                self.callback(results)
+            tnext += self.period
+            now = time.monotonic()
+            if now > tnext:
+                self.overruns += 1
+                self.cmdhandler.debugprint("sweep %d overrun: %.3f s, period %.3f s, budget %.3f s"%(
+                        self.cycles,now-tstart,self.period,budget))
+                tnext = now         # start the next cycle at once, don't try to catch up
+            else:
+                time.sleep(tnext-now)
+
+    def report(self,file=sys.stdout):
+        print("%d boards, %d cycles, %d overruns"%(len(self.addrs),self.cycles,self.overruns),file=file)
+        print("period %.3f s, budget %.3f s, last %.3f s, worst %.3f s"%(
+                self.period,self.budget(),self.lastcycle,self.worstcycle),file=file)
+        quarantined = self.breaker.quarantined()
+        if quarantined:
+            print("quarantined: %s"%" ".join(["%d"%addr for addr in quarantined]),file=file)
+
+
+if __name__ == "__main__":
+    import docopt
+    import arx
+    import arxcmds
+
+    opts = docopt.docopt(__doc__)
+    commname = opts['--port'] or "/dev/ttyUSB0"
+    bus = arx.arx485('bus',commname,baudrate=int(opts['--baud']))
+    if not bus.serial:
+        print("unable to open 485 interface at",commname)
+        sys.exit(1)
+    cmdhandler = arxcmds.arxcmd()
+    cmdhandler.setBus(bus)
+    if opts['--metrics']:
+        import arxmetrics
+        metrics = arxmetrics.arxmetrics()
+        metrics.serve(int(opts['--metrics']))
+        cmdhandler.setMetrics(metrics)
+
+    owteperiod = float(opts['--owte']) or None
+    ncycles = int(opts['--cycles']) or None
+    addrs = [int(a,0) for a in opts['<addr>']]
+    archive = None
+    if opts['--archive']:
+        import arxarchive
+        for addr in addrs:          # configuration words for the archive
+            cmdhandler.setAddr(addr)
+            cmdhandler.geta()
+        archive = arxarchive.arxarchive(opts['--archive'],addrs,cmdhandler.shadow)
+    sweep = arxsweep(cmdhandler,addrs,
+                     period=float(opts['--period']),owteperiod=owteperiod,
+                     callback=archive.add if archive else None,
+                     sleep=opts['--sleep'])
+    try:
+        sweep.run(ncycles)
+    except KeyboardInterrupt:
+        pass
+    if archive:
+        archive.close()
+        if archive.errors or archive.dropped:
+            print("archive: %d chunks not written, %d sweeps dropped"%(archive.errors,archive.dropped))
+    sweep.report()
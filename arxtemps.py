@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Usage:
+  arxtemps [--port=<serialPort>] [--baud=<baud>] [--cache=<file>] [--cycles=<n>] <addr>...
+
+Options:
+  -p --port=<serialPort>   Serial port of the RS485 interface
+  -b --baud=<baud>         Baud rate of the boards [default: 19200]
+  -c --cache=<file>        Metadata cache file (see arxmeta.py) [default: arxmeta.json]
+  -n --cycles=<n>          Number of collections [default: 1]
+
+arx temps
+
+Channel temperatures of many boards from their 1-wire sensors, as a
+(boards,16) array in C indexed by channel code, NaN where a channel has no
+sensor.
+
+Which channel each sensor is at comes from the ARXN sensor map, and the
+number of sensors from OWDC; both are static, so they are taken from the
+metadata cache (arxmeta.py), checked with one ARXN per board when the
+collector starts or refresh() is called, and never read again for each
+collection.  OWTE takes up to 1 s per board, so a collection only sends
+OWTE, and only to boards that have sensors; the replies of all boards
+are then converted together by arxcmds.owtearray().
+
+Created on Sun Oct 18 22:31:05 2026
+
+"""
+import sys
+import time
+
+import arxcmds
+import arxmeta
+
+
+class arxtemps():
+    """ class to collect the channel temperatures of a list of boards
+
+    cmdhandler is an arxcmds.arxcmd already connected to the bus; meta is
+    an arxmeta.arxmeta, by default the one in arxmeta.defaultfile.
+    """
+    def __init__(self,cmdhandler,addrs,meta=None):
+        self.cmdhandler = cmdhandler
+        self.addrs = list(addrs)
+        if meta is None:
+            meta = arxmeta.arxmeta()
+        self.meta = meta
+        self.chanmaps = [[-1]*16 for addr in self.addrs]
+        self.nsensors = [0]*len(self.addrs)
+        self.refresh()
+
+    def refresh(self):
+        """check the metadata of the boards (one ARXN each) and take their sensor maps"""
+        entries = self.meta.validate(self.cmdhandler,self.addrs)
+        for i,addr in enumerate(self.addrs):
+            entry = entries.get(addr)
+            if entry is None:
+                self.chanmaps[i] = [-1]*16
+                self.nsensors[i] = 0
+                continue
+            self.chanmaps[i] = arxcmds.sensorchannels(entry['sensormap'],entry['ndevices'])
+            self.nsensors[i] = entry['ndevices']
+
+    def collect(self):
+        """OWTE from every board with sensors.  Returns (time,array), the array
+        as arxcmds.owtearray(), one row per address in addrs.
+        """
+        cmdhandler = self.cmdhandler
+        current = cmdhandler.addr
+        t = time.time()
+        replies = []
+        for addr,n in zip(self.addrs,self.nsensors):
+            if n == 0:
+                replies.append(None)
+                continue
+            cmdhandler.setAddr(addr)
+            res = cmdhandler.owte()
+            replies.append(res.raw if res else None)
+        cmdhandler.setAddr(current)
+        return t,arxcmds.owtearray(replies,self.chanmaps)
+
+
+if __name__ == "__main__":
+    import docopt
+    import arx
+
+    opts = docopt.docopt(__doc__)
+    commname = opts['--port'] or "/dev/ttyUSB0"
+    bus = arx.arx485('bus',commname,baudrate=int(opts['--baud']))
+    if not bus.serial:
+        print("unable to open 485 interface at",commname)
+        sys.exit(1)
+    cmdhandler = arxcmds.arxcmd(dneu=None)
+    cmdhandler.setBus(bus)
+    addrs = [int(a,0) for a in opts['<addr>']]
+    temps = arxtemps(cmdhandler,addrs,arxmeta.arxmeta(opts['--cache']))
+    print("addr "+" ".join(["%5d"%(c+1) for c in range(16)]))
+    for i in range(int(opts['--cycles'])):
+        t,a = temps.collect()
+        for addr,row in zip(addrs,a):
+            print("%4d "%addr+" ".join(["  -  " if v != v else "%5.1f"%v for v in row]))
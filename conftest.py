@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+pytest fixtures: a command handler talking to boards emulated on a pty by
+arxemulator.py (Linux and macOS only).
+
+Created on Sun Oct 18 23:48:10 2026
+
+"""
+import pytest
+
+import arx
+import arxcmds
+import arxemulator
+
+
+@pytest.fixture
+def emulator():
+    emulator = arxemulator.arxemulator([2,3],baudrate=19200)
+    emulator.start()
+    yield emulator
+    emulator.stop()
+
+@pytest.fixture
+def cmdhandler(emulator):
+    bus = arx.arx485('bus',emulator.port,baudrate=19200)
+    cmdhandler = arxcmds.arxcmd(dneu=None)
+    cmdhandler.setBus(bus)
+    cmdhandler.setAddr(2)
+    for i in range(3):          # the emulator may miss a command sent as it starts
+        if cmdhandler.echo("UP"):
+            break
+    yield cmdhandler
+    bus.serial.close()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+tests of arxcmds.arxcmd and arxasync.aioarxcmd against the emulated boards
+
+Created on Sun Oct 18 23:51:36 2026
+
+"""
+import asyncio
+
+import arxasync
+import arxcmds
+import arxregistry
+
+
+def test_nak_to_empty_reply_then_command(cmdhandler):
+    """a NAK (4 characters) to a command whose reply is empty (2) is read
+    whole, and the next command gets its own reply"""
+    res = cmdhandler.load(1)            # memory 1 never saved: NAK 32
+    assert res.status == 'nak'
+    assert res.value == '32'
+    assert res.raw == b'\x1532\r'
+    res = cmdhandler.temp()
+    assert res.status == 'ack'
+    res = cmdhandler.echo("NEXT")
+    assert res.value == 'ECHONEXT'
+
+def test_async_nak_to_empty_reply_then_command(emulator):
+    async def run():
+        bus = arxasync.aioarx485('bus',emulator.port,baudrate=19200)
+        cmdhandler = arxasync.aioarxcmd(bus)
+        for i in range(3):
+            if await cmdhandler.echo(2,"UP"):
+                break
+        nak = await cmdhandler.transact(2,'LOAD1')
+        temp = await cmdhandler.temp(2)
+        bus.close()
+        return nak,temp
+    nak,temp = asyncio.run(run())
+    assert (nak.status,nak.value) == ('nak','32')
+    assert temp.status == 'ack'
+
+def test_reply_of_wrong_length_is_an_error():
+    res = arxcmds.makeresult(2,'CURB',b'\x0601A\r')
+    assert res.status == 'error'
+    res = arxcmds.makeresult(2,'CURB',b'\x0601A2\r')
+    assert res.status == 'ack'
+
+def test_echo_limit_from_registry(cmdhandler):
+    """ECHO takes up to 74 characters (rev 1.7c), sync and async alike"""
+    assert arxregistry.maxtext('ECHO') == 74
+    res = cmdhandler.echo("X"*74)
+    assert res.status == 'ack'
+    assert res.value == 'ECHO'+"X"*74
+    assert cmdhandler.echo("X"*75).status == 'error'
+    res = asyncio.run(arxasync.aioarxcmd(None).echo(2,"X"*75))
+    assert res.status == 'error'
@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+tests of the NAK breakdown of arxmetrics.py
+
+Created on Mon Oct 19 00:04:27 2026
+
+"""
+import arxmetrics
+
+
+def test_record_full_nak_to_empty_reply():
+    metrics = arxmetrics.arxmetrics()
+    metrics.record('bus',2,'SETC30000',11,b'\x1531\r',0.008)
+    assert metrics.naks == {('bus','SETC','2','3','1'):1}
+    assert metrics.transactions[('bus','SETC','2','nak')] == 1
+    assert 'reason="1"' in metrics.render()
+
+def test_nak_reason_from_the_bus(cmdhandler):
+    """the whole NAK to LOAD, whose reply is empty, is read and counted by reason"""
+    metrics = arxmetrics.arxmetrics()
+    cmdhandler.setMetrics(metrics)
+    assert cmdhandler.load(1).status == 'nak'      # memory 1 never saved: NAK 32
+    assert cmdhandler.temp().status == 'ack'
+    assert metrics.naks == {('bus','LOAD','2','3','2'):1}
+    assert metrics.transactions[('bus','TEMP','2','ack')] == 1
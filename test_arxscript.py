@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+tests of the CSV log of arxscript.py
+
+Created on Sun Oct 18 23:58:02 2026
+
+"""
+import csv
+import io
+
+import arxcmds
+import arxscript
+
+
+def test_logrow_arxn():
+    res = arxcmds.makeresult(2,'ARXN',b'\x0600020107000102215F000000000000\r')
+    arxcmds.decodearxn(res)
+    assert isinstance(res.value,arxcmds.boardinfo)
+    row = arxscript.logrow(7,res)
+    assert row[1:5] == (7,2,'ARXN','ack')
+    assert "serial number 2" in row[6]
+    assert "channels: 3 2" in row[6]
+
+def test_runscript_logs_arxn(cmdhandler):
+    logfile = io.StringIO()
+    steps = [(1,2,'arxn',(),'ARXN'),(2,2,'curb',(),'CURB')]
+    assert arxscript.runscript(cmdhandler,steps,logfile) == 0
+    rows = list(csv.reader(io.StringIO(logfile.getvalue())))
+    assert rows[0] == list(arxscript.logcolumns)
+    assert [r[3] for r in rows[1:]] == ['ARXN','CURB']
+    assert rows[1][6].startswith("ARX serial number 2")